@@ -0,0 +1,29 @@
+"""add placeholder index to document templates
+
+Revision ID: 5e1f0c2a9b47
+Revises: de3bb9555ba5
+Create Date: 2026-10-16 09:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1f0c2a9b47'
+down_revision: Union[str, None] = 'de3bb9555ba5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows are compiled lazily the first time they are processed
+    op.add_column('document_templates', sa.Column('placeholder_index', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('document_templates', 'placeholder_index')
@@ -0,0 +1,54 @@
+"""move chat messages to their own table
+
+Revision ID: a3c9e1d27f64
+Revises: 5e1f0c2a9b47
+Create Date: 2026-10-16 11:40:08.215637
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1d27f64'
+down_revision: Union[str, None] = '5e1f0c2a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chat_messages',
+    sa.Column('chat_id', sa.UUID(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(), nullable=False),
+    sa.Column('content', sa.TEXT(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['chat_id'], ['chat_histories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('chat_id', 'seq')
+    )
+    # Backfill one row per element of the old JSONB array, keeping its position
+    op.execute("""
+        INSERT INTO chat_messages (chat_id, seq, role, content, created_at)
+        SELECT h.id, m.ordinality - 1, m.value->>'role', COALESCE(m.value->>'content', ''), h.created_at
+        FROM chat_histories h
+        CROSS JOIN LATERAL jsonb_array_elements(h.messages) WITH ORDINALITY AS m(value, ordinality)
+        WHERE h.messages IS NOT NULL AND jsonb_typeof(h.messages) = 'array'
+    """)
+    op.drop_column('chat_histories', 'messages')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('chat_histories', sa.Column('messages', postgresql.JSONB(astext_type=sa.Text()), autoincrement=False, nullable=True))
+    op.execute("""
+        UPDATE chat_histories h
+        SET messages = (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object('role', m.role, 'content', m.content) ORDER BY m.seq), '[]'::jsonb)
+            FROM chat_messages m
+            WHERE m.chat_id = h.id
+        )
+    """)
+    op.drop_table('chat_messages')
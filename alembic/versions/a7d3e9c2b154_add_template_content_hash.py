@@ -0,0 +1,62 @@
+"""add template content hash
+
+Revision ID: a7d3e9c2b154
+Revises: f2c8d4a6b319
+Create Date: 2026-10-16 23:59:51.206734
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9c2b154'
+down_revision: Union[str, None] = 'f2c8d4a6b319'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def template_content_hash(row) -> str:
+    """Frozen copy of app.etag.template_content_hash"""
+    canonical = json.dumps({
+        "name": row.name,
+        "description": row.description,
+        "category_id": row.category_id,
+        "fields_schema": row.fields_schema,
+        "template_content": row.template_content,
+    }, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('document_templates', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    templates = sa.table(
+        'document_templates',
+        sa.column('id', sa.UUID()), sa.column('name', sa.String()), sa.column('description', sa.TEXT()),
+        sa.column('category_id', sa.UUID()), sa.column('fields_schema', postgresql.JSONB()),
+        sa.column('template_content', postgresql.JSONB()), sa.column('content_hash', sa.String()),
+    )
+    conn = op.get_bind()
+    ids = conn.execute(sa.select(templates.c.id)).scalars().all()
+    # SFDT bodies can be large, so only a chunk of them is held in memory at a time
+    for start in range(0, len(ids), 100):
+        rows = conn.execute(
+            sa.select(templates.c.id, templates.c.name, templates.c.description, templates.c.category_id, templates.c.fields_schema, templates.c.template_content)
+            .where(templates.c.id.in_(ids[start:start + 100]))
+        ).fetchall()
+        conn.execute(
+            templates.update().where(templates.c.id == sa.bindparam('b_id')).values(content_hash=sa.bindparam('b_content_hash')),
+            [{"b_id": row.id, "b_content_hash": template_content_hash(row)} for row in rows],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('document_templates', 'content_hash')
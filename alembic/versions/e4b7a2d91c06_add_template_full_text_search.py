@@ -0,0 +1,79 @@
+"""add template full text search
+
+Revision ID: e4b7a2d91c06
+Revises: c81e5a0f3d92
+Create Date: 2026-10-16 23:41:05.518204
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a2d91c06'
+down_revision: Union[str, None] = 'c81e5a0f3d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_TEXT_MAX_CHARS = 200000
+PLACEHOLDER_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+def extract_text(sfdt_content) -> str:
+    """Frozen copy of app.sfdt.extract_text so this migration doesn't change if the app does"""
+    if not isinstance(sfdt_content, dict):
+        return ""
+    paragraphs = []
+    stack = [sfdt_content[key] for key in ("sections", "sec") if key in sfdt_content]
+    stack.reverse()
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        inlines = next((node[key] for key in ("inlines", "i") if isinstance(node.get(key), list)), None)
+        if inlines is not None:
+            runs = [next((inline[key] for key in ("text", "tlp") if isinstance(inline.get(key), str)), "") for inline in inlines if isinstance(inline, dict)]
+            paragraph = PLACEHOLDER_RE.sub(r"\1", "".join(runs)).strip()
+            if paragraph:
+                paragraphs.append(paragraph)
+        stack.extend(reversed([value for key, value in node.items() if key not in ("inlines", "i") and isinstance(value, (dict, list))]))
+    return "\n".join(paragraphs)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('document_templates', sa.Column('search_text', sa.TEXT(), nullable=True))
+
+    templates = sa.table('document_templates', sa.column('id', sa.UUID()), sa.column('template_content', postgresql.JSONB()), sa.column('search_text', sa.TEXT()))
+    conn = op.get_bind()
+    ids = conn.execute(sa.select(templates.c.id)).scalars().all()
+    # SFDT bodies can be large, so only a chunk of them is held in memory at a time
+    for start in range(0, len(ids), 100):
+        rows = conn.execute(sa.select(templates.c.id, templates.c.template_content).where(templates.c.id.in_(ids[start:start + 100]))).fetchall()
+        conn.execute(
+            templates.update().where(templates.c.id == sa.bindparam('b_id')).values(search_text=sa.bindparam('b_search_text')),
+            [{"b_id": row.id, "b_search_text": extract_text(row.template_content)[:SEARCH_TEXT_MAX_CHARS]} for row in rows],
+        )
+
+    # Generated from the columns above, so it can never drift from them
+    op.add_column('document_templates', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(search_text, '')), 'C')",
+        persisted=True,
+    ), nullable=True))
+    op.create_index('ix_document_templates_search_vector', 'document_templates', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_document_templates_search_vector', table_name='document_templates', postgresql_using='gin')
+    op.drop_column('document_templates', 'search_vector')
+    op.drop_column('document_templates', 'search_text')
@@ -0,0 +1,47 @@
+"""add chat history search
+
+Revision ID: f2c8d4a6b319
+Revises: e4b7a2d91c06
+Create Date: 2026-10-16 23:58:42.730114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8d4a6b319'
+down_revision: Union[str, None] = 'e4b7a2d91c06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lets a GIN index lead with the user_id uuid column
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    op.add_column('chat_messages', sa.Column('user_id', sa.UUID(), nullable=True))
+    op.execute("""
+        UPDATE chat_messages m
+        SET user_id = h.user_id
+        FROM chat_histories h
+        WHERE h.id = m.chat_id
+    """)
+    op.add_column('chat_messages', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('english', content)", persisted=True), nullable=True))
+    op.create_index('ix_chat_messages_user_id_search_vector', 'chat_messages', ['user_id', 'search_vector'], unique=False, postgresql_using='gin')
+
+    op.add_column('chat_histories', sa.Column('title_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('english', coalesce(title, ''))", persisted=True), nullable=True))
+    op.create_index('ix_chat_histories_user_id_title_vector', 'chat_histories', ['user_id', 'title_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_histories_user_id_title_vector', table_name='chat_histories', postgresql_using='gin')
+    op.drop_column('chat_histories', 'title_vector')
+    op.drop_index('ix_chat_messages_user_id_search_vector', table_name='chat_messages', postgresql_using='gin')
+    op.drop_column('chat_messages', 'search_vector')
+    op.drop_column('chat_messages', 'user_id')
@@ -1,26 +1,127 @@
+import asyncio
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, schemas
-from typing import Optional
-from .db import get_db
+from typing import Any, Callable, Dict, Optional, Tuple
+from .db import get_async_db
+from .cache import TTLCache
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 360
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below BCRYPT_ROUNDS are flagged by needs_update and upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# --- Principal Cache ---
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "10000"))
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, detached from any session"""
+    id: uuid.UUID
+    username: str
+    email: str
+
+# token -> verified claims; claims never change, so these entries only expire
+token_cache = TTLCache("tokens", maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL)
+# user id -> Principal, versioned per user so profile changes take effect immediately
+principal_cache = TTLCache("principals", maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL)
+
+def principal_namespace(user_id: uuid.UUID) -> str:
+    return f"user:{user_id}"
+
+def invalidate_principal(user_id: uuid.UUID) -> None:
+    principal_cache.invalidate(principal_namespace(user_id))
+
+# --- Password Hashing Pool ---
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated thread pool (bcrypt releases the GIL) so hashing never blocks
+    the event loop. Work beyond `max_pending` queued or running jobs is refused with a 503.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_ms": self.total_seconds / self.completed * 1000 if self.completed else 0.0,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher()
+
+async def verify_password(plain_password, hashed_password) -> bool:
+    return await password_hasher.run(pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Returns (valid, new_hash); new_hash is set when the stored hash uses outdated cost parameters"""
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash(password) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
+
+def _replacement_hash(plain_password, hashed_password) -> Optional[str]:
+    valid, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    # The verify result decides whether a new hash is needed at all
+    return new_hash if valid else pwd_context.hash(plain_password)
+
+async def replacement_password_hash(plain_password, hashed_password) -> Optional[str]:
+    """
+    The hash to store when a user submits `plain_password`: None when it matches the stored
+    hash as is, the upgraded hash when only the cost changed, otherwise a fresh hash. One job
+    on the hashing pool; a fresh hash is computed only when the password really changed.
+    """
+    return await password_hasher.run(_replacement_hash, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -32,20 +133,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    def decode():
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise credentials_exception
+        if payload.get("sub") is None:
             raise credentials_exception
-        user = db.query(models.User).filter(models.User.username == username).first()
+        return {"sub": payload["sub"], "uid": payload.get("uid"), "exp": payload["exp"]}
+
+    claims = token_cache.get_or_load(token, decode, namespace="tokens")
+    if claims["exp"] <= time.time():
+        raise credentials_exception
+
+    if claims["uid"] is None:
+        # Tokens issued before they carried the user id
+        user = (await db.execute(select(models.User).where(models.User.username == claims["sub"]))).scalars().first()
         if user is None:
             raise credentials_exception
-        return user
-    except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        return Principal(id=user.id, username=user.username, email=user.email)
+
+    user_id = uuid.UUID(claims["uid"])
+
+    async def load():
+        user = await db.get(models.User, user_id)
+        return Principal(id=user.id, username=user.username, email=user.email) if user else None
+
+    principal = await principal_cache.aget_or_load(user_id, load, namespace=principal_namespace(user_id))
+    if principal is None:
+        raise credentials_exception
+    return principal
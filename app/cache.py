@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+TEMPLATE_CACHE_MAXSIZE = int(os.getenv("TEMPLATE_CACHE_MAXSIZE", "512"))
+TEMPLATE_CACHE_TTL = float(os.getenv("TEMPLATE_CACHE_TTL", "300"))
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL, namespace version stamps and single-flight loading.
+
+    Entries remember the version of their namespace at the time the load started.
+    Bumping a namespace with ``invalidate`` makes every older entry a miss, including
+    values that were still being loaded when the write happened.
+    """
+
+    def __init__(self, name: str, maxsize: int = TEMPLATE_CACHE_MAXSIZE, ttl: float = TEMPLATE_CACHE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, str, int]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def invalidate(self, *namespaces: str) -> None:
+        with self._lock:
+            for namespace in namespaces:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at, namespace, version = entry
+        if expires_at < time.monotonic() or version != self._versions.get(namespace, 0):
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any, namespace: str, version: int) -> None:
+        if version != self._versions.get(namespace, 0):
+            # A write landed while we were loading; don't cache the stale value
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl, namespace, version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            found, value = self._lookup(key)
+            return value if found else None
+
+    def _claim(self, key: Hashable, namespace: str) -> Tuple[bool, Any, Optional[Future], Optional[int]]:
+        """Returns (hit, value, future, version). A version is only returned to the load leader."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return True, value, None, None
+            self.misses += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, None, future, None
+            future = self._inflight[key] = Future()
+            return False, None, future, self._versions.get(namespace, 0)
+
+    def _settle(self, key: Hashable, future: Future, namespace: str, version: int, value: Any = None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if exc is None:
+                self._store(key, value, namespace, version)
+            del self._inflight[key]
+        if exc is None:
+            future.set_result(value)
+        else:
+            future.set_exception(exc)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], namespace: str = "default") -> Any:
+        hit, value, future, version = self._claim(key, namespace)
+        if hit:
+            return value
+        if version is None:
+            return future.result()
+        try:
+            value = loader()
+        except BaseException as exc:
+            self._settle(key, future, namespace, version, exc=exc)
+            raise
+        self._settle(key, future, namespace, version, value=value)
+        return value
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], namespace: str = "default") -> Any:
+        """Async twin of get_or_load; shares in-flight loads with sync callers"""
+        hit, value, future, version = self._claim(key, namespace)
+        if hit:
+            return value
+        if version is None:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await loader()
+        except BaseException as exc:
+            self._settle(key, future, namespace, version, exc=exc)
+            raise
+        self._settle(key, future, namespace, version, value=value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+
+# Templates and categories embed each other in their responses, so writes to
+# either bump both namespaces.
+TEMPLATES = "templates"
+CATEGORIES = "categories"
+
+catalogue_cache = TTLCache("catalogue")
+
+
+def invalidate_catalogue() -> None:
+    catalogue_cache.invalidate(TEMPLATES, CATEGORIES)
+
+
+# --- Completion cache ---
+
+CHAT_RESPONSE_CACHE = os.getenv("CHAT_RESPONSE_CACHE", "false").lower() in ("1", "true", "yes")
+CHAT_RESPONSE_CACHE_TTL = float(os.getenv("CHAT_RESPONSE_CACHE_TTL", "86400"))
+CHAT_RESPONSE_CACHE_MAX_BYTES = int(os.getenv("CHAT_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CHAT_RESPONSE_REPLAY_CHUNK_CHARS = int(os.getenv("CHAT_RESPONSE_REPLAY_CHUNK_CHARS", "24"))
+CHAT_RESPONSE_REPLAY_INTERVAL_MS = float(os.getenv("CHAT_RESPONSE_REPLAY_INTERVAL_MS", "15"))
+
+
+def completion_key(prompt: str, deployment: str, messages: List[Dict[str, str]]) -> str:
+    """Hash of everything that determines a completion; whitespace differences don't matter"""
+    normalized = [" ".join(prompt.split()), deployment or ""]
+    normalized.extend(f"{m['role']}\x1f{' '.join(m['content'].split())}" for m in messages)
+    return hashlib.sha256("\x1e".join(normalized).encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    """Deltas of a completion that is still streaming, readable by any number of followers"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def push(self, delta: str) -> None:
+        self.parts.append(delta)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            while index < len(self.parts):
+                yield self.parts[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class CompletionCache:
+    """LRU cache of finished completions bounded by TTL and total size in bytes.
+
+    Hits are replayed as a paced stream of deltas, and identical requests that arrive
+    while the first one is still streaming follow its deltas instead of calling upstream.
+    Runs on the event loop only, so it needs no locking.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = CHAT_RESPONSE_CACHE,
+        ttl: float = CHAT_RESPONSE_CACHE_TTL,
+        max_bytes: int = CHAT_RESPONSE_CACHE_MAX_BYTES,
+        replay_chunk_chars: int = CHAT_RESPONSE_REPLAY_CHUNK_CHARS,
+        replay_interval: float = CHAT_RESPONSE_REPLAY_INTERVAL_MS / 1000,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay_chunk_chars = replay_chunk_chars
+        self.replay_interval = replay_interval
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._inflight: Dict[str, _InFlight] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        text, expires_at, size = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.bytes -= size
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _store(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if not text or size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[2]
+        self._entries[key] = (text, time.monotonic() + self.ttl, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    async def _replay(self, text: str) -> AsyncIterator[str]:
+        step = max(1, self.replay_chunk_chars)
+        for start in range(0, len(text), step):
+            if start and self.replay_interval > 0:
+                await asyncio.sleep(self.replay_interval)
+            yield text[start:start + step]
+
+    async def _lead(self, key: str, inflight: _InFlight, deltas: AsyncIterable[str]) -> AsyncIterator[str]:
+        completed = False
+        error: Optional[BaseException] = None
+        try:
+            async for delta in deltas:
+                inflight.push(delta)
+                yield delta
+            completed = True
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            del self._inflight[key]
+            if completed:
+                self._store(key, "".join(inflight.parts))
+            elif error is None:
+                # The leading client went away mid-stream; followers can't be given a partial answer
+                error = RuntimeError("Upstream completion was abandoned")
+            inflight.finish(error)
+
+    def stream(self, key: str, load: Callable[[], AsyncIterable[str]]) -> AsyncIterator[str]:
+        """Deltas for `key`: replayed from cache, shared with an identical in-flight request, or loaded"""
+        if not self.enabled:
+            return load().__aiter__()
+        text = self._lookup(key)
+        if text is not None:
+            self.hits += 1
+            return self._replay(text)
+        self.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return inflight.follow()
+        inflight = self._inflight[key] = _InFlight()
+        return self._lead(key, inflight, load())
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+completion_cache = CompletionCache()
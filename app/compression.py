@@ -0,0 +1,231 @@
+import asyncio
+import os
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional; without it clients fall back to zstd or gzip
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+# Bodies at least this large are compressed in a worker thread instead of on the event loop
+COMPRESSION_THREAD_MIN_BYTES = int(os.getenv("COMPRESSION_THREAD_MIN_BYTES", "262144"))
+# Streams whose consumers read incrementally are never buffered or compressed
+COMPRESSION_EXCLUDED_TYPES = {
+    t.strip().lower() for t in os.getenv("COMPRESSION_EXCLUDED_TYPES", "text/event-stream,application/x-ndjson").split(",") if t.strip()
+}
+
+
+# --- Encoders ---
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Everything compressed so far, without ending the stream"""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Server preference order, used to break ties between equally weighted client choices
+ENCODERS: Dict[str, Callable] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best available coding for an Accept-Encoding header, or None to send the body as is"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    default = weights.get("*", 0.0)
+    candidates = [(weights.get(name, default), -rank, name) for rank, name in enumerate(ENCODERS)]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    encoder = ENCODERS[encoding]()
+    return encoder.compress(data) + encoder.finish()
+
+
+def compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in COMPRESSION_EXCLUDED_TYPES:
+        return False
+    return media_type.startswith("text/") or media_type.endswith(("json", "xml", "javascript"))
+
+
+def add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary", "")
+    if "accept-encoding" not in vary.lower() and vary.strip() != "*":
+        headers["vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+
+def no_compression(endpoint):
+    """Route decorator (below @router.get etc.) that keeps the middleware away from its responses"""
+    endpoint.no_compression = True
+    return endpoint
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware that compresses responses with the best coding the client accepts
+    (zstd, br or gzip, depending on what is installed). Bodies under `minimum_size` go out
+    as is. Streamed bodies are compressed chunk by chunk, each chunk flushed so nothing
+    waits in the compressor. Event streams, NDJSON, `Cache-Control: no-transform` and
+    @no_compression routes are skipped. Compressed responses get a weak ETag: the bytes
+    differ from the identity representation the strong ETag names.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        encoder = None
+        pending: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                if self.eligible(scope, message):
+                    start = message
+                else:
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is not None:
+                await send({"type": "http.response.body", "body": await self.run(encoder, body, more_body), "more_body": more_body})
+                return
+
+            pending.append(body)
+            size = sum(len(chunk) for chunk in pending)
+            if more_body and size < self.minimum_size:
+                return
+            data = b"".join(pending)
+            pending.clear()
+            headers = MutableHeaders(scope=start)
+            if size < self.minimum_size:
+                passthrough = True
+                add_vary(headers)
+                await send(start)
+                await send({"type": "http.response.body", "body": data})
+                return
+
+            encoder = ENCODERS[encoding]()
+            compressed = await self.run(encoder, data, more_body)
+            del headers["content-length"]
+            headers["content-encoding"] = encoding
+            add_vary(headers)
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["etag"] = "W/" + etag
+            if not more_body:
+                headers["content-length"] = str(len(compressed))
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def eligible(self, scope, message) -> bool:
+        status = message["status"]
+        if status < 200 or status in (204, 304):
+            return False
+        if getattr(getattr(scope.get("route"), "endpoint", None), "no_compression", False):
+            return False
+        message["headers"] = list(message.get("headers", []))
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", "").lower():
+            return False
+        if not compressible(headers.get("content-type")):
+            return False
+        content_length = headers.get("content-length")
+        return not (content_length and content_length.isdigit() and int(content_length) < self.minimum_size)
+
+    @staticmethod
+    async def run(encoder, data: bytes, more_body: bool) -> bytes:
+        def work():
+            return encoder.compress(data) + (encoder.flush() if more_body else encoder.finish())
+        if len(data) >= COMPRESSION_THREAD_MIN_BYTES:
+            return await asyncio.to_thread(work)
+        return work()
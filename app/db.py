@@ -1,20 +1,122 @@
+import asyncio
 import os
+import time
+from typing import Optional
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
+from .metrics import CheckoutTimer, instrument_engine
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def to_async_url(url: str) -> str:
+    """Point a sync Postgres URL at the asyncpg driver"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (to_async_url(DATABASE_URL) if DATABASE_URL else None)
+
+# --- Pool Settings ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_POOL_WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM_CONNECTIONS", str(min(DB_POOL_SIZE, 4))))
+
+pool_options = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+sync_connect_args = {}
+async_connect_args = {}
+if DB_STATEMENT_TIMEOUT_MS:
+    sync_connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+class InstrumentedQueuePool(CheckoutTimer, QueuePool):
+    metrics_name = "sync"
+
+class InstrumentedAsyncQueuePool(CheckoutTimer, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+# Engines are created on first use (normally by the app lifespan), so importing the app
+# never touches the database. The session factories are bound at that point.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        if not DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is not set")
+        _engine = create_engine(DATABASE_URL, connect_args=sync_connect_args, poolclass=InstrumentedQueuePool, **pool_options)
+        instrument_engine(_engine, "sync")
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        if not ASYNC_DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is not set")
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=async_connect_args, poolclass=InstrumentedAsyncQueuePool, **pool_options)
+        instrument_engine(_async_engine.sync_engine, "async")
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+async def warm_pools(connections: int = DB_POOL_WARM_CONNECTIONS) -> None:
+    """Open `connections` pooled connections on each engine so the first requests don't pay for connecting"""
+    async def ping_async():
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            # Hold the connection until every ping has one, otherwise they all reuse the first
+            await asyncio.sleep(0.05)
+
+    def ping_sync():
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+            time.sleep(0.05)
+
+    await asyncio.gather(
+        *(ping_async() for _ in range(connections)),
+        *(asyncio.to_thread(ping_sync) for _ in range(connections)),
+    )
+
+async def ping() -> None:
+    async with get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def dispose_engines() -> None:
+    """Close pooled connections; the engines reconnect if used again"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
 
 Base = declarative_base()
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
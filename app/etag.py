@@ -0,0 +1,50 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from fastapi import Request, Response
+
+# Clients may keep catalogue responses but must revalidate them with If-None-Match
+CATALOGUE_CACHE_CONTROL = os.getenv("CATALOGUE_CACHE_CONTROL", "private, no-cache")
+
+
+def content_hash(value: Any) -> str:
+    """sha256 of the canonical JSON form, so key order and whitespace never change it"""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def template_content_hash(name: str, description: Optional[str], category_id: Optional[UUID], fields_schema: Any, template_content: Any) -> str:
+    """Stored on DocumentTemplate at write time; covers every column a template response is built from"""
+    return content_hash({
+        "name": name,
+        "description": description,
+        "category_id": category_id,
+        "fields_schema": fields_schema,
+        "template_content": template_content,
+    })
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag for a representation: the content version plus anything else that shapes the body"""
+    return f'"{content_hash(list(parts))[:32]}"'
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True when the client already has `etag` (weak comparison, as RFC 9110 requires for If-None-Match)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CATALOGUE_CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -1,11 +1,62 @@
-from fastapi import FastAPI
-from .db import engine, Base
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from . import db, metrics, ratelimit
+from .auth import password_hasher
+from .persistence import persistence_worker
+from .cache import catalogue_cache, completion_cache
+from .compression import CompressionMiddleware
+from .uploads import BodyLimitMiddleware, TEMPLATE_UPLOAD_MAX_REQUEST_BYTES
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import auth as auth_router, chat as chat_router, users as users_router, template as temp_router, category as category_router
 
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Schema changes are applied with `alembic upgrade head`, not at startup
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    app.state.ready = False
+    db.get_engine()
+    db.get_async_engine()
+    chat_router.get_client()
+    persistence_worker.start()
+    loop_monitor = asyncio.create_task(metrics.monitor_event_loop())
+
+    if STARTUP_WARMUP:
+        results = await asyncio.gather(
+            db.warm_pools(),
+            chat_router.warm_client(),
+            asyncio.to_thread(chat_router.system_prompt_tokens),  # Loads the tokenizer
+            return_exceptions=True,
+        )
+        if isinstance(results[0], Exception):
+            # Stay up; /ready reports the database until it becomes reachable
+            logger.error(f"Database warm-up failed: {results[0]}")
+    app.state.ready = True
+    logger.info(f"Startup finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    yield
+
+    app.state.ready = False
+    loop_monitor.cancel()
+    # Flush queued chat turns before the database and upstream clients go away
+    await persistence_worker.stop()
+    await asyncio.to_thread(temp_router.shutdown_batch_pool)
+    password_hasher.shutdown()
+    await chat_router.close_client()
+    await ratelimit.close_backend()
+    await db.dispose_engines()
+
+# orjson serializes the large SFDT trees several times faster than the stdlib encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(auth_router.router)
 app.include_router(chat_router.router)
@@ -20,7 +71,40 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(BodyLimitMiddleware, limits=[
+    ("/template/create", TEMPLATE_UPLOAD_MAX_REQUEST_BYTES),
+    ("/template/update/", TEMPLATE_UPLOAD_MAX_REQUEST_BYTES),
+])
+app.add_middleware(metrics.MetricsMiddleware)
+
+def collect_component_stats():
+    metrics.observe_stats("password_hasher", password_hasher.stats())
+    metrics.observe_stats("catalogue_cache", catalogue_cache.stats())
+    metrics.observe_stats("completion_cache", completion_cache.stats())
+    metrics.observe_stats("persistence", persistence_worker.stats())
+
+metrics.registry.add_collector(collect_component_stats)
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Unlike /health, only succeeds once startup warm-up is done and the database answers"""
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Starting up")
+    try:
+        await asyncio.wait_for(db.ping(), READINESS_TIMEOUT)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    return {"status": "ready"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"catalogue": catalogue_cache.stats(), "completions": completion_cache.stats(), "persistence": persistence_worker.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,318 @@
+import asyncio
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG_INTERVAL_MS = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_MS", "500"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+RATE_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+
+
+# --- Metric Types ---
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """Exposition lines for every labelled series"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._format_labels(key)} {value}"
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._format_labels(key)} {value}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                yield f"{self.name}_bucket{self._format_labels(key, (('le', le),))} {cumulative}"
+            yield f"{self.name}_sum{self._format_labels(key)} {state[-1]}"
+            yield f"{self.name}_count{self._format_labels(key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Called at scrape time to refresh gauges that mirror state owned elsewhere"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector.__name__} failed: {e}")
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+# --- HTTP ---
+http_requests = registry.counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_request_duration = registry.histogram("http_request_duration_seconds", "Time until the response body is fully sent.", ("method", "route"))
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+
+# --- Database ---
+db_pool_checkout_wait = registry.histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",), FAST_BUCKETS)
+db_pool_in_use = registry.gauge("db_pool_connections_in_use", "Connections currently checked out.", ("pool",))
+db_pool_size = registry.gauge("db_pool_connections_open", "Connections currently open, idle or in use.", ("pool",))
+db_query_duration = registry.histogram("db_query_duration_seconds", "Statement execution time.", ("pool",), FAST_BUCKETS)
+db_query_errors = registry.counter("db_query_errors_total", "Statements that raised.", ("pool",))
+
+# --- Upstream LLM ---
+llm_time_to_first_token = registry.histogram("llm_time_to_first_token_seconds", "Time from the completion request to its first text delta.", ("model",))
+llm_stream_duration = registry.histogram("llm_stream_duration_seconds", "Duration of a streamed completion.", ("model", "outcome"))
+llm_tokens_per_second = registry.histogram("llm_tokens_per_second", "Completion tokens per second after the first token.", ("model",), RATE_BUCKETS)
+llm_completion_tokens = registry.counter("llm_completion_tokens_total", "Completion tokens streamed from upstream.", ("model",))
+
+# --- Application ---
+chat_time_to_first_byte = registry.histogram("chat_time_to_first_byte_seconds", "Time from receiving a /chat/ request to its first streamed answer frame.")
+rate_limit_rejections = registry.counter("rate_limit_rejections_total", "Requests rejected by a rate limit.", ("scope",))
+event_loop_lag = registry.histogram("event_loop_lag_seconds", "How late the event loop woke a periodic timer.", (), FAST_BUCKETS)
+component_stat = registry.gauge("app_component_stat", "Point-in-time counters of in-process caches, pools and queues.", ("component", "stat"))
+
+
+def observe_stats(component: str, stats: Dict[str, object]) -> None:
+    for stat, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            component_stat.set(value, component=component, stat=stat)
+
+
+# --- SQLAlchemy Instrumentation ---
+
+def instrument_engine(engine, pool_name: str) -> None:
+    """Time statements and track pool occupancy; pass `engine.sync_engine` for async engines"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started, pool=pool_name)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        db_query_errors.inc(pool=pool_name)
+
+    def collect_pool() -> None:
+        pool = engine.pool
+        if hasattr(pool, "checkedout"):
+            db_pool_in_use.set(pool.checkedout(), pool=pool_name)
+            db_pool_size.set(pool.checkedout() + pool.checkedin(), pool=pool_name)
+
+    collect_pool.__name__ = f"collect_pool_{pool_name}"
+    registry.add_collector(collect_pool)
+
+
+class CheckoutTimer:
+    """Mixin for QueuePool subclasses that records how long checkouts wait for a connection"""
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started, pool=self.metrics_name)
+
+
+# --- LLM Streams ---
+
+class StreamTimer:
+    """Records time to first token, duration and throughput of one upstream stream"""
+
+    def __init__(self, model: str):
+        self.model = model or "unknown"
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            llm_time_to_first_token.observe(self.first_token_at - self.started, model=self.model)
+
+    def finish(self, completion_tokens: int, outcome: str = "ok") -> None:
+        finished = time.perf_counter()
+        llm_stream_duration.observe(finished - self.started, model=self.model, outcome=outcome)
+        if completion_tokens:
+            llm_completion_tokens.inc(completion_tokens, model=self.model)
+        if self.first_token_at is not None and finished > self.first_token_at and completion_tokens > 1:
+            llm_tokens_per_second.observe(completion_tokens / (finished - self.first_token_at), model=self.model)
+
+
+# --- Event Loop ---
+
+async def monitor_event_loop(interval: float = EVENT_LOOP_LAG_INTERVAL_MS / 1000) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, loop.time() - expected))
+
+
+# --- ASGI Middleware ---
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware so streaming bodies pass through untouched; the duration covers the
+    whole response, including the tail of event streams. Routes are labelled by their path
+    template to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        http_requests_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=route_path)
+            http_requests.inc(method=method, route=route_path, status=str(status_code))
@@ -1,7 +1,7 @@
 import string
 from tempfile import template
-from sqlalchemy import TEXT, Column, String, ForeignKey, DateTime
-from sqlalchemy.dialects.postgresql import UUID, JSONB 
+from sqlalchemy import TEXT, Column, Computed, String, ForeignKey, DateTime, Integer, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.sql import func
 import uuid
 from .db import Base
@@ -20,9 +20,33 @@ class ChatHistory(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     title = Column(String, nullable=True)  # Add the title column
-    messages = Column(JSONB) 
     created_at = Column(DateTime, server_default=func.now())  # Add the timestamp column
+    summary = Column(TEXT, nullable=True)  # Rolling summary of messages truncated from the prompt
+    summary_upto_seq = Column(Integer, nullable=True)  # The summary covers messages with seq below this
+    title_vector = Column(TSVECTOR, Computed("to_tsvector('english', coalesce(title, ''))", persisted=True))
     user = relationship("User", back_populates="chats")
+    messages = relationship("ChatMessage", back_populates="chat", order_by="ChatMessage.seq", passive_deletes=True)
+    __table_args__ = (
+        # Serves the newest-first, keyset-paginated history listing per user
+        Index("ix_chat_histories_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Composite GIN (btree_gin) so a user's search only reads that user's postings
+        Index("ix_chat_histories_user_id_title_vector", "user_id", "title_vector", postgresql_using="gin"),
+    )
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+    chat_id = Column(UUID(as_uuid=True), ForeignKey("chat_histories.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # Position of the message within its chat, starting at 0
+    role = Column(String, nullable=False)
+    content = Column(TEXT, nullable=False)
+    token_count = Column(Integer, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    user_id = Column(UUID(as_uuid=True), nullable=True)  # Copied from the chat so search can be scoped by user in the index
+    search_vector = Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True))
+    chat = relationship("ChatHistory", back_populates="messages")
+    __table_args__ = (
+        Index("ix_chat_messages_user_id_search_vector", "user_id", "search_vector", postgresql_using="gin"),
+    )
 
 class DocumentTemplate(Base):
     __tablename__="document_templates"
@@ -31,9 +55,21 @@ class DocumentTemplate(Base):
     description = Column(TEXT, nullable=True)
     fields_schema = Column(JSONB)
     template_content = Column(JSONB, nullable=False)
+    placeholder_index = Column(JSONB, nullable=True)  # Compiled {{field}} slots, see sfdt.compile_template
+    search_text = Column(TEXT, nullable=True)  # Document text extracted from the SFDT, see sfdt.extract_text
+    content_hash = Column(String(64), nullable=True)  # Set on every write, see etag.template_content_hash
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(search_text, '')), 'C')",
+        persisted=True,
+    ))
     category_id = Column(UUID(as_uuid=True), ForeignKey("template_categories.id"))
     created_at = Column(DateTime, server_default=func.now())
     category = relationship("TemplateCategory", back_populates="templates")
+    __table_args__ = (
+        Index("ix_document_templates_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 class TemplateCategory(Base):
     __tablename__='template_categories'
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from . import models
+from .db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+PERSIST_FLUSH_INTERVAL_MS = float(os.getenv("PERSIST_FLUSH_INTERVAL_MS", "100"))
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "100"))
+PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", "5"))
+PERSIST_RETRY_BACKOFF_MS = float(os.getenv("PERSIST_RETRY_BACKOFF_MS", "200"))
+
+
+@dataclass
+class CompletedTurn:
+    """Everything a finished chat turn still has to write once the response has been sent"""
+    chat_id: uuid.UUID
+    content: Optional[str] = None  # Assistant message; None when only metadata is pending
+    token_count: Optional[int] = None
+    title: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+
+
+async def lock_chats(session, chat_ids) -> None:
+    """
+    Take the chat_histories row locks for the rest of the transaction, so concurrent writers
+    to one chat (another request or worker process) assign seq one at a time instead of
+    reading the same max(seq). Rows are locked in id order to keep batches deadlock-free.
+    """
+    chat_ids = sorted(set(chat_ids))
+    if not chat_ids:
+        return
+    await session.execute(
+        select(models.ChatHistory.id)
+        .where(models.ChatHistory.id.in_(chat_ids))
+        .order_by(models.ChatHistory.id)
+        .with_for_update()
+    )
+
+
+def next_message_seq(chat_id: uuid.UUID):
+    """Scalar subquery for the next seq in a chat, so an INSERT assigns it in the same statement; hold lock_chats() first"""
+    return select(func.coalesce(func.max(models.ChatMessage.seq) + 1, 0)).where(
+        models.ChatMessage.chat_id == chat_id
+    ).scalar_subquery()
+
+
+def chat_owner(chat_id: uuid.UUID):
+    """Scalar subquery for the chat's user, denormalized onto each message for per-user search"""
+    return select(models.ChatHistory.user_id).where(models.ChatHistory.id == chat_id).scalar_subquery()
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, (OperationalError, InterfaceError, asyncio.TimeoutError, ConnectionError))
+
+
+class PersistenceWorker:
+    """
+    Write-behind queue for completed chat turns. Turns are grouped into one transaction per
+    flush interval (or batch size), transient database errors are retried with backoff, and
+    stop() drains whatever is still queued. A batch that fails for any other reason is
+    retried turn by turn so one bad row (e.g. a chat deleted mid-stream) doesn't drop the rest.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        flush_interval: float = PERSIST_FLUSH_INTERVAL_MS / 1000,
+        batch_size: int = PERSIST_BATCH_SIZE,
+        max_retries: int = PERSIST_MAX_RETRIES,
+        retry_backoff: float = PERSIST_RETRY_BACKOFF_MS / 1000,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[uuid.UUID, int] = {}
+        self._settled: Dict[uuid.UUID, asyncio.Event] = {}
+        self.flushed_turns = 0
+        self.flushes = 0
+        self.retries = 0
+        self.dropped_turns = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, turn: CompletedTurn) -> None:
+        """Never blocks, so it is safe to call from a response generator's finally block"""
+        self.start()
+        self._pending[turn.chat_id] = self._pending.get(turn.chat_id, 0) + 1
+        self._queue.put_nowait(turn)
+
+    async def wait_for(self, chat_id: uuid.UUID) -> None:
+        """Barrier for the next turn in a chat: returns once earlier turns are written"""
+        if self._pending.get(chat_id):
+            event = self._settled.setdefault(chat_id, asyncio.Event())
+            await event.wait()
+
+    def _release(self, turns: List[CompletedTurn]) -> None:
+        for turn in turns:
+            remaining = self._pending.get(turn.chat_id, 0) - 1
+            if remaining > 0:
+                self._pending[turn.chat_id] = remaining
+                continue
+            self._pending.pop(turn.chat_id, None)
+            event = self._settled.pop(turn.chat_id, None)
+            if event is not None:
+                event.set()
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                logger.error(f"Persistence worker failed to flush {len(batch)} turns: {e}")
+            finally:
+                self._release(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, turns: List[CompletedTurn]) -> None:
+        async with self.session_factory() as session:
+            await lock_chats(session, (turn.chat_id for turn in turns if turn.content))
+            for turn in turns:
+                if turn.content:
+                    await session.execute(insert(models.ChatMessage).values(
+                        chat_id=turn.chat_id, seq=next_message_seq(turn.chat_id), user_id=chat_owner(turn.chat_id), role="assistant", content=turn.content, token_count=turn.token_count
+                    ))
+                if turn.title:
+                    await session.execute(
+                        update(models.ChatHistory).where(models.ChatHistory.id == turn.chat_id).values(title=turn.title)
+                    )
+            await session.commit()
+
+    async def _write_with_retry(self, turns: List[CompletedTurn]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._write(turns)
+                return
+            except Exception as e:
+                if not is_transient(e) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"Transient error writing {len(turns)} turns, retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+
+    async def _flush(self, batch: List[CompletedTurn]) -> None:
+        started = time.perf_counter()
+        written = batch
+        try:
+            await self._write_with_retry(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Dropping turn for chat {batch[0].chat_id}: {e}")
+                self.dropped_turns += 1
+                return
+            logger.warning(f"Batch of {len(batch)} turns failed, writing them one by one: {e}")
+            written = []
+            for turn in batch:
+                try:
+                    await self._write_with_retry([turn])
+                    written.append(turn)
+                except Exception as e:
+                    logger.error(f"Dropping turn for chat {turn.chat_id}: {e}")
+                    self.dropped_turns += 1
+
+        self.flushes += 1
+        self.flushed_turns += len(written)
+        prompt_tokens = sum(t.prompt_tokens or 0 for t in written)
+        completion_tokens = sum(t.token_count or 0 for t in written)
+        logger.info(
+            f"Persisted {len(written)} turns in {(time.perf_counter() - started) * 1000:.0f} ms "
+            f"({prompt_tokens} prompt / {completion_tokens} completion tokens)"
+        )
+
+    async def stop(self) -> None:
+        """Drain the queue, writing every turn still in it"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pending_chats": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_turns": self.flushed_turns,
+            "retries": self.retries,
+            "dropped_turns": self.dropped_turns,
+        }
+
+
+persistence_worker = PersistenceWorker()
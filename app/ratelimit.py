@@ -0,0 +1,214 @@
+import math
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from . import auth, metrics
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # Seconds until the current window rolls over
+    retry_after: float  # Seconds until a rejected caller may try again; 0 when allowed
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def sliding_window_result(previous: int, current: int, elapsed: float, limit: int, window: float, allowed: bool) -> RateLimitResult:
+    """
+    Sliding-window counter: the previous fixed window's count is weighted by how much of it
+    still overlaps the sliding window. O(1) state per key instead of one timestamp per request.
+    """
+    estimate = previous * (1 - elapsed / window) + current
+    reset_after = window - elapsed
+    if allowed:
+        return RateLimitResult(True, limit, max(0, int(limit - estimate)), reset_after, 0)
+
+    # A retry is allowed once the estimate leaves room for it: estimate + 1 <= limit
+    if current >= limit:
+        # Wait for the window to roll, then for the old count's weight to decay enough
+        retry_after = reset_after + window * (1 - (limit - 1) / current)
+    else:
+        retry_after = window * (1 - (limit - current - 1) / previous) - elapsed
+    return RateLimitResult(False, limit, 0, reset_after, max(retry_after, 0))
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        """Count one request against `key` and report whether it is within `limit` per `window` seconds"""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Per-process backend. Keys are spread over independently locked shards, and each shard
+    drops keys that have been idle for two windows, so memory tracks active users only.
+    """
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, sweep_every: int = 1024):
+        self._shards: List[Dict[str, list]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._ops = [0] * shards
+        self._sweep_every = sweep_every
+
+    def _shard(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % len(self._shards)
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = time.monotonic()
+        index = self._shard(key)
+        with self._locks[index]:
+            buckets = self._shards[index]
+            self._ops[index] += 1
+            if self._ops[index] % self._sweep_every == 0:
+                self._evict_idle(buckets, now, window)
+
+            window_start = now - now % window
+            # state: [window_start, previous_count, current_count, last_seen]
+            state = buckets.get(key)
+            if state is None:
+                state = buckets[key] = [window_start, 0, 0, now]
+            elif state[0] != window_start:
+                # Roll over; more than one window of silence means nothing carries over
+                state[1] = state[2] if window_start - state[0] == window else 0
+                state[2] = 0
+                state[0] = window_start
+            state[3] = now
+
+            elapsed = now - window_start
+            # Same rule as the Redis backend: the estimate including this request stays within the limit
+            allowed = state[1] * (1 - elapsed / window) + state[2] + 1 <= limit
+            if allowed:
+                state[2] += 1
+            return sliding_window_result(state[1], state[2], elapsed, limit, window, allowed)
+
+    @staticmethod
+    def _evict_idle(buckets: Dict[str, list], now: float, window: float) -> None:
+        idle = [key for key, state in buckets.items() if now - state[3] > 2 * window]
+        for key in idle:
+            del buckets[key]
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for buckets in self._shards)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Shared backend for multi-worker deployments. Uses only INCR/DECR/EXPIRE/GET, so it works
+    against any Redis-protocol server, including in-process stand-ins such as fakeredis.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit"):
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str = REDIS_URL) -> "RedisRateLimitBackend":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        return cls(redis_asyncio.from_url(url))
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = time.time()
+        window_index = int(now // window)
+        elapsed = now - window_index * window
+        current_key = f"{self._prefix}:{key}:{window_index}"
+        previous_key = f"{self._prefix}:{key}:{window_index - 1}"
+
+        pipe = self._client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(math.ceil(window * 2)))
+        pipe.get(previous_key)
+        current, _, previous = await pipe.execute()
+        previous = int(previous or 0)
+
+        allowed = previous * (1 - elapsed / window) + current <= limit
+        if not allowed:
+            # Rejected requests don't consume quota
+            current = await self._client.decr(current_key)
+        return sliding_window_result(previous, current, elapsed, limit, window, allowed)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_backend() -> RateLimitBackend:
+    global _backend
+    if _backend is None:
+        if RATE_LIMIT_BACKEND == "redis":
+            _backend = RedisRateLimitBackend.from_url(REDIS_URL)
+        else:
+            _backend = InMemoryRateLimitBackend()
+    return _backend
+
+
+def set_backend(backend: RateLimitBackend) -> None:
+    global _backend
+    _backend = backend
+
+
+async def close_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+async def enforce(key: str, limit: int, window: float, response: Response) -> RateLimitResult:
+    result = await get_backend().hit(key, limit, window)
+    headers = result.headers()
+    if not result.allowed:
+        metrics.rate_limit_rejections.inc(scope=key.split(":", 1)[0])
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many requests. Please try again after {headers['Retry-After']} seconds.",
+            headers=headers,
+        )
+    response.headers.update(headers)
+    return result
+
+
+# --- Dependencies ---
+# Routes that return their own Response object (e.g. streaming) don't get the headers set on the
+# injected Response, so the dependencies also return the result for the route to pass along.
+
+def limit_per_user(scope: str, limit: int, window: float):
+    async def dependency(response: Response, current_user: auth.Principal = Depends(auth.get_current_user)) -> RateLimitResult:
+        return await enforce(f"{scope}:user:{current_user.id}", limit, window, response)
+    return dependency
+
+
+def limit_per_client(scope: str, limit: int, window: float):
+    async def dependency(request: Request, response: Response) -> RateLimitResult:
+        client_host = request.client.host if request.client else "unknown"
+        return await enforce(f"{scope}:ip:{client_host}", limit, window, response)
+    return dependency
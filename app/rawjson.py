@@ -0,0 +1,49 @@
+from typing import Any, Dict, Iterable, Optional, Union
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Text, cast, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+RawText = Optional[Union[str, bytes]]
+
+
+class RawJSONResponse(Response):
+    """A body that is already JSON; sent as is, skipping response_model validation and encoding"""
+    media_type = "application/json"
+
+
+def as_json_text(column):
+    """Select a JSONB/JSON expression as its text form so the driver never decodes it"""
+    return cast(column, Text)
+
+
+def json_array_text(element, order_by):
+    """json_agg() of `element` in `order_by` order, as text; '[]' instead of NULL for no rows"""
+    return func.coalesce(as_json_text(func.json_agg(aggregate_order_by(element, order_by))), "[]")
+
+
+def raw_bytes(value: RawText) -> bytes:
+    if value is None:
+        return b"null"
+    return value if isinstance(value, bytes) else value.encode("utf-8")
+
+
+def dumps_object(fields: Dict[str, Any], raw: Iterable[str] = ()) -> bytes:
+    """
+    Serialize `fields` as a JSON object in their order. Values under the `raw` keys are
+    already JSON text (e.g. a JSONB column read ::text) and are spliced in without parsing.
+    """
+    raw = set(raw)
+    # One join at the end, so a large raw value is copied once
+    pieces = [b"{"]
+    for key, value in fields.items():
+        if len(pieces) > 1:
+            pieces.append(b",")
+        pieces += (orjson.dumps(key), b":", raw_bytes(value) if key in raw else orjson.dumps(value))
+    pieces.append(b"}")
+    return b"".join(pieces)
+
+
+def dumps_array(items: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
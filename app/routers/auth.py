@@ -1,27 +1,40 @@
+import os
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from .. import models, schemas, auth
-from ..db import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas, auth, ratelimit
+from ..db import get_async_db
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+LOGIN_RATE_LIMIT_WINDOW = int(os.getenv("LOGIN_RATE_LIMIT_WINDOW", "60"))
+LOGIN_RATE_LIMIT_MAX_REQUESTS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_REQUESTS", "20"))
+login_rate_limit = ratelimit.limit_per_client("login", LOGIN_RATE_LIMIT_MAX_REQUESTS, LOGIN_RATE_LIMIT_WINDOW)
+
+@router.post("/token", response_model=schemas.Token, dependencies=[Depends(login_rate_limit)])
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(models.User).where(models.User.username == form_data.username))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+    valid, new_hash = await auth.verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
-    access_token = auth.create_access_token(data={"sub": user.username})
+    if new_hash:
+        # Transparently upgrade hashes made with older cost parameters
+        user.hashed_password = new_hash
+        await db.commit()
+    access_token = auth.create_access_token(data={"sub": user.username, "uid": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=schemas.User)
-async def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter((models.User.username == user.username) | (models.User.email == user.email)).first()
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(select(models.User).where((models.User.username == user.username) | (models.User.email == user.email)))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Username or email already registered")
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await auth.get_password_hash(user.password)
     db_user = models.User(username=user.username, email=user.email, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
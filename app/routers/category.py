@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload, load_only
+from typing import List, Optional
 from uuid import UUID
 
 from .. import models, schemas
 from ..db import get_db
+from ..cache import catalogue_cache, invalidate_catalogue, CATEGORIES
+from ..etag import cache_headers, content_hash, if_none_match, make_etag, not_modified
 # from ..auth import auth  
 
 router = APIRouter(prefix="/category", tags=['Categories'])
@@ -15,6 +18,79 @@ router = APIRouter(prefix="/category", tags=['Categories'])
 async def get_current_active_user():
     return True
 
+# --- Cached Category Catalogue ---
+def category_snapshot(db_category: models.TemplateCategory) -> dict:
+    return {
+        "id": db_category.id,
+        "name": db_category.name,
+        "templates": [
+            {
+                "id": t.id,
+                "name": t.name,
+                "description": t.description,
+                "category_id": t.category_id,
+                "created_at": t.created_at,
+                "fields_schema": t.fields_schema,
+                "template_content": t.template_content,
+            }
+            for t in db_category.templates
+        ],
+    }
+
+def get_cached_categories(db: Session) -> List[dict]:
+    """Every category with its full templates, loaded in two queries"""
+    def load():
+        categories = db.query(models.TemplateCategory).options(selectinload(models.TemplateCategory.templates)).all()
+        return [category_snapshot(c) for c in categories]
+    return catalogue_cache.get_or_load("categories", load, namespace=CATEGORIES)
+
+def get_cached_category_tree(db: Session) -> List[dict]:
+    """Category -> template summaries, loaded in two queries without touching the JSONB columns"""
+    def load():
+        summary_columns = load_only(
+            models.DocumentTemplate.id,
+            models.DocumentTemplate.name,
+            models.DocumentTemplate.description,
+            models.DocumentTemplate.category_id,
+            models.DocumentTemplate.created_at,
+        )
+        categories = db.query(models.TemplateCategory).options(
+            selectinload(models.TemplateCategory.templates).options(summary_columns)
+        ).all()
+        return [
+            {
+                "id": c.id,
+                "name": c.name,
+                "templates": [
+                    {"id": t.id, "name": t.name, "description": t.description, "created_at": t.created_at}
+                    for t in c.templates
+                ],
+            }
+            for c in categories
+        ]
+    return catalogue_cache.get_or_load("category_tree", load, namespace=CATEGORIES)
+
+def get_catalogue_version(db: Session) -> str:
+    """Hash over category ids/names and template content hashes; changes whenever any category GET would"""
+    def load():
+        categories = db.execute(
+            select(models.TemplateCategory.id, models.TemplateCategory.name).order_by(models.TemplateCategory.id)
+        ).all()
+        templates = db.execute(
+            select(models.DocumentTemplate.id, models.DocumentTemplate.category_id, models.DocumentTemplate.content_hash)
+            .order_by(models.DocumentTemplate.id)
+        ).all()
+        return content_hash([[list(row) for row in categories], [list(row) for row in templates]])
+    return catalogue_cache.get_or_load("catalogue_version", load, namespace=CATEGORIES)
+
+def catalogue_etag(request: Request, response: Response, db: Session, *representation) -> Optional[Response]:
+    """Sets ETag/Cache-Control for a category GET and returns a 304 when the client is current"""
+    etag = make_etag(get_catalogue_version(db), *representation)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    return None
+
 # --- TemplateCategory Routes ---
 
 @router.post("/create", response_model=schemas.TemplateCategory, dependencies=[Depends(get_current_active_user)])
@@ -25,22 +101,37 @@ def create_category(category: schemas.TemplateCategoryCreate, db: Session = Depe
     db_category = models.TemplateCategory(**category.model_dump())
     db.add(db_category)
     db.commit()
+    invalidate_catalogue()
     db.refresh(db_category)
     return db_category
 
 @router.get("/all", response_model=List[schemas.TemplateCategoryRead])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    categories = db.query(models.TemplateCategory).offset(skip).limit(limit).all()
-    return categories
+def read_categories(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    unchanged = catalogue_etag(request, response, db, "all", skip, limit)
+    if unchanged:
+        return unchanged
+    return get_cached_categories(db)[skip:skip + limit]
 
 @router.get("/info", response_model=List[schemas.TemplateCategoryReadWithoutTemplates])
-def read_categories_names_and_id(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    categories = db.query(models.TemplateCategory).all()
-    return categories
+def read_categories_names_and_id(request: Request, response: Response, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    unchanged = catalogue_etag(request, response, db, "info")
+    if unchanged:
+        return unchanged
+    return [{"id": c["id"], "name": c["name"]} for c in get_cached_category_tree(db)]
+
+@router.get("/tree", response_model=List[schemas.TemplateCategoryTree])
+def read_category_tree(request: Request, response: Response, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    unchanged = catalogue_etag(request, response, db, "tree")
+    if unchanged:
+        return unchanged
+    return get_cached_category_tree(db)
 
 @router.get("/{category_id}", response_model=schemas.TemplateCategoryRead)
-def read_category(category_id: UUID, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    db_category = db.query(models.TemplateCategory).filter(models.TemplateCategory.id == category_id).first()
+def read_category(category_id: UUID, request: Request, response: Response, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    unchanged = catalogue_etag(request, response, db, "category", category_id)
+    if unchanged:
+        return unchanged
+    db_category = next((c for c in get_cached_categories(db) if c["id"] == category_id), None)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
@@ -54,6 +145,7 @@ def update_category(category_id: UUID, category: schemas.TemplateCategoryUpdate,
         setattr(db_category, key, value)
     db.add(db_category)
     db.commit()
+    invalidate_catalogue()
     db.refresh(db_category)
     return db_category
 
@@ -64,4 +156,5 @@ def delete_category(category_id: UUID, db: Session = Depends(get_db), current_us
         raise HTTPException(status_code=404, detail="Category not found")
     db.delete(db_category)
     db.commit()
+    invalidate_catalogue()
     return db_category
\ No newline at end of file
@@ -1,18 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from .. import models, schemas, auth
-from ..db import get_db
-from openai import AsyncAzureOpenAI, AzureOpenAI
-from typing import List, AsyncIterable, Optional, Any, Dict
+from sqlalchemy import select, insert, update, func, and_, bindparam, tuple_, case, null, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas, auth, ratelimit, metrics
+from ..cache import completion_cache, completion_key
+from ..compression import no_compression
+from ..db import get_async_db, AsyncSessionLocal
+from ..pagination import encode_cursor, decode_cursor
+from ..rawjson import RawJSONResponse, dumps_array, dumps_object, json_array_text
+from ..search import headline, render_headline, to_tsquery
+from ..persistence import CompletedTurn, chat_owner, lock_chats, next_message_seq, persistence_worker
+from ..streaming import SSE_HEADERS, StreamRelay, sse_event
+from openai import AsyncAzureOpenAI
+from typing import List, AsyncIterable, Optional, Any, Dict, Tuple, Union, Literal
 import uuid
 import os
 import logging
-from asyncio import Lock
 import asyncio
+import functools
 import time
 import json
 
+try:
+    import tiktoken
+except ImportError:  # Falls back to a character-based estimate
+    tiktoken = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(module)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -25,17 +38,31 @@ api_version = os.getenv("AZURE_OPENAI_API_VERSION")
 if not all([OPENAI_API_KEY, endpoint, model_name, deployment, api_version]):
     logger.error("One or more Azure OpenAI environment variables are not set.")
 
-client = AsyncAzureOpenAI(
-    azure_endpoint=endpoint,
-    api_key=OPENAI_API_KEY,
-    api_version=api_version,
-    timeout=30
-)
-clientTitle = AzureOpenAI(
-    azure_endpoint=endpoint,
-    api_key=OPENAI_API_KEY,
-    api_version=api_version,
-)
+_client: Optional[AsyncAzureOpenAI] = None
+
+def get_client() -> AsyncAzureOpenAI:
+    """Created on first use (normally by the app lifespan) rather than at import"""
+    global _client
+    if _client is None:
+        _client = AsyncAzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=OPENAI_API_KEY,
+            api_version=api_version,
+            timeout=30
+        )
+    return _client
+
+async def warm_client() -> None:
+    """Open a keep-alive connection to the upstream so the first chat doesn't pay for TCP and TLS setup"""
+    try:
+        await get_client().with_options(max_retries=0, timeout=5).models.list()
+    except Exception as e:
+        # Any HTTP answer, including an error status, leaves a pooled connection behind
+        logger.info(f"Upstream warm-up request finished with: {e}")
+
+async def close_client() -> None:
+    if _client is not None:
+        await _client.close()
 
 SYSTEM_PROMPT = """
 You are CaseSimpli AI, a specialized legal advisor designed to support legal research, simplify complex legal concepts, deliver precise and actionable legal insights, and generate, draft or retrieve sample legal documents. Your expertise lies in Nigerian law, with the capability to reference relevant global legal principles when appropriate. Your responses must always be professional, comprehensive, accurate, and ethically responsible. If you are unsure or the query is outside your expertise, state that you cannot answer definitively and suggest consulting a human legal professional.
@@ -52,25 +79,91 @@ Avoid titles that are:
 The Conversation is from the user role
 """
 
+SUMMARY_PROMPT = """
+You maintain a running summary of a legal consultation between a user and CaseSimpli AI. You are given the current summary (which may be empty) and the messages that followed it. Return an updated summary that keeps every fact, party, date, jurisdiction, document and open question the assistant may need later. Be concise and do not add commentary.
+"""
+
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-RATE_LIMIT_WINDOW = 60
-RATE_LIMIT_MAX_REQUESTS = 10
-user_rate_limits = {}
-rate_limit_lock = Lock()
-
-async def check_rate_limit(user_id: int):
-    async with rate_limit_lock:
-        now = int(time.time())
-        if user_id not in user_rate_limits:
-            user_rate_limits[user_id] = []
-        user_rate_limits[user_id] = [ts for ts in user_rate_limits[user_id] if now - ts < RATE_LIMIT_WINDOW]
-        if len(user_rate_limits[user_id]) >= RATE_LIMIT_MAX_REQUESTS:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Too many requests. Please try again after {RATE_LIMIT_WINDOW - (now - user_rate_limits[user_id][0])} seconds."
-            )
-        user_rate_limits[user_id].append(now)
+# --- Context Budgeting ---
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "6000"))
+# When the window overflows, fold history into the summary until the rest fits in this share of
+# the budget, so the next turns have headroom and don't each pay for a summary call
+CHAT_SUMMARY_LOW_WATER = float(os.getenv("CHAT_SUMMARY_LOW_WATER", "0.6"))
+CHAT_TOKENIZER_ENCODING = os.getenv("CHAT_TOKENIZER_ENCODING", "cl100k_base")
+MESSAGE_TOKEN_OVERHEAD = 4  # role and separators added by the chat format
+
+_encoding = None
+_encoding_loaded = False
+
+def get_encoding():
+    """Loaded on first use (or by the lifespan warm-up); tiktoken may fetch the BPE file"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(CHAT_TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning(f"Tokenizer {CHAT_TOKENIZER_ENCODING} unavailable, estimating token counts: {e}")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text)) + MESSAGE_TOKEN_OVERHEAD
+    return len(text) // 4 + 1 + MESSAGE_TOKEN_OVERHEAD
+
+@functools.lru_cache(maxsize=None)
+def system_prompt_tokens() -> int:
+    return count_tokens(SYSTEM_PROMPT)
+
+def build_context(stored_messages: List[Dict], summary: Optional[str], budget: int = CHAT_CONTEXT_TOKEN_BUDGET) -> Tuple[List[Dict], int, Dict[str, Any]]:
+    """
+    Fit the newest messages within the token budget, prefixed by the rolling summary of
+    anything older. `stored_messages` carry seq, role, content and token_count, oldest first.
+    Returns the messages to send, the seq of the first kept message, and logging stats.
+    """
+    summary_message = {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"} if summary else None
+    summary_tokens = count_tokens(summary_message["content"]) if summary_message else 0
+    remaining = budget - system_prompt_tokens() - summary_tokens
+
+    kept: List[Dict] = []
+    for message in reversed(stored_messages):
+        if kept and message["token_count"] > remaining:
+            break
+        # The newest message is always sent, even if it alone exceeds the budget
+        kept.append(message)
+        remaining -= message["token_count"]
+    kept.reverse()
+
+    first_kept_seq = kept[0]["seq"] if kept else 0
+    context = [{"role": m["role"], "content": m["content"]} for m in kept]
+    if summary_message:
+        context.insert(0, summary_message)
+    stats = {
+        "prompt_tokens": budget - remaining,
+        "kept_messages": len(kept),
+        "dropped_messages": len(stored_messages) - len(kept),
+        "summary_tokens": summary_tokens,
+    }
+    return context, first_kept_seq, stats
+
+async def summarize_messages(previous_summary: Optional[str], messages: List[Dict]) -> str:
+    """Fold newly truncated messages into the existing summary instead of re-summarizing the whole chat"""
+    transcript = "\n\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = await get_client().chat.completions.create(
+        model=model_name,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"},
+        ],
+    )
+    return response.choices[0].message.content.strip()
+
+RATE_LIMIT_WINDOW = int(os.getenv("CHAT_RATE_LIMIT_WINDOW", "60"))
+RATE_LIMIT_MAX_REQUESTS = int(os.getenv("CHAT_RATE_LIMIT_MAX_REQUESTS", "10"))
+chat_rate_limit = ratelimit.limit_per_user("chat", RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW)
 
 async def stream_processor(response: AsyncIterable[Any]):
     try:
@@ -81,118 +174,432 @@ async def stream_processor(response: AsyncIterable[Any]):
                     yield delta.content
     except Exception as e:
         logger.error(f"Streaming error: {e}")
-        yield f"Error: {e}"
+        raise
 
 async def get_openai_streaming_response(messages: List[schemas.Message], prompt: str = "") -> AsyncIterable[Any]:
     effective_messages = [{"role": "system", "content": prompt or SYSTEM_PROMPT}] + [{"role": msg.role, "content": msg.content} for msg in messages]
     try:
-        response = await client.chat.completions.create(model=model_name, messages=effective_messages, stream=True)
+        response = await get_client().chat.completions.create(model=model_name, messages=effective_messages, stream=True)
         return response
     except Exception as e:
         logger.error(f"OpenAI API Streaming Error: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"OpenAI API Error during streaming: {e}")
 
-async def generate_response(messages_to_process: List[Dict]):
+async def append_message(db: AsyncSession, chat_id: uuid.UUID, message: Dict) -> None:
+    """Single-row INSERT of the next message in a chat; seq is assigned in the same statement, under the chat's row lock"""
+    await lock_chats(db, [chat_id])
+    await db.execute(insert(models.ChatMessage).values(
+        chat_id=chat_id, seq=next_message_seq(chat_id), user_id=chat_owner(chat_id), role=message["role"], content=message["content"], token_count=count_tokens(message["content"])
+    ))
+
+async def load_context_messages(db: AsyncSession, history: models.ChatHistory) -> List[Dict]:
+    """Messages not yet folded into the summary, with token counts filled in and cached for older rows"""
+    rows = await db.execute(
+        select(models.ChatMessage.seq, models.ChatMessage.role, models.ChatMessage.content, models.ChatMessage.token_count)
+        .where(models.ChatMessage.chat_id == history.id, models.ChatMessage.seq >= (history.summary_upto_seq or 0))
+        .order_by(models.ChatMessage.seq)
+    )
+    messages, uncounted = [], []
+    for seq, role, content, token_count in rows:
+        if token_count is None:
+            token_count = count_tokens(content)
+            uncounted.append({"b_seq": seq, "b_token_count": token_count})
+        messages.append({"seq": seq, "role": role, "content": content, "token_count": token_count})
+    if uncounted:
+        table = models.ChatMessage.__table__
+        await db.execute(
+            update(table)
+            .where(and_(table.c.chat_id == history.id, table.c.seq == bindparam("b_seq")))
+            .values(token_count=bindparam("b_token_count")),
+            uncounted,
+        )
+    return messages
+
+async def generate_title(message: str) -> str:
+    """Generate a chat title; runs alongside the main stream rather than before it"""
+    try:
+        title_response = await get_client().chat.completions.create(model=model_name, messages=[{"role": "system", "content": TITLE_PROMPT}] + [{"role": "user", "content": message}])
+        if title_response.choices:
+            title = title_response.choices[0].message.content.strip()
+        else:
+            title = "New Chat..."
+    except Exception as e:
+        logger.error(f"Title Generation Error: {e}")
+        title = "New Chat"
+    return title
+
+async def refresh_summary(chat_id: uuid.UUID, upto_seq: int) -> Tuple[Optional[str], int]:
+    """
+    Extend the stored summary to cover every message before upto_seq. Returns the stored
+    summary and the seq it covers up to, which is 0 when the chat no longer exists.
+    """
+    while True:
+        async with AsyncSessionLocal() as session:
+            history = (await session.execute(
+                select(models.ChatHistory.summary, models.ChatHistory.summary_upto_seq).where(models.ChatHistory.id == chat_id)
+            )).first()
+            if history is None:
+                return None, 0
+            covered = history.summary_upto_seq or 0
+            if covered >= upto_seq:
+                return history.summary, covered
+            rows = await session.execute(
+                select(models.ChatMessage.role, models.ChatMessage.content)
+                .where(
+                    models.ChatMessage.chat_id == chat_id,
+                    models.ChatMessage.seq >= covered,
+                    models.ChatMessage.seq < upto_seq,
+                )
+                .order_by(models.ChatMessage.seq)
+            )
+            new_messages = [{"role": role, "content": content} for role, content in rows]
+        # No transaction or row lock is held during the LLM call
+        summary = await summarize_messages(history.summary, new_messages)
+        async with AsyncSessionLocal() as session:
+            # Compare-and-set: if an overlapping refresh moved the summary on meanwhile, start over from
+            # its result instead of overwriting it with one that covers less
+            stored = await session.execute(
+                update(models.ChatHistory)
+                .where(models.ChatHistory.id == chat_id, func.coalesce(models.ChatHistory.summary_upto_seq, 0) == covered)
+                .values(summary=summary, summary_upto_seq=upto_seq)
+                .returning(models.ChatHistory.id)
+            )
+            if stored.first() is not None:
+                await session.commit()
+                logger.info(f"Chat {chat_id}: summary extended over {len(new_messages)} messages up to seq {upto_seq}")
+                return summary, upto_seq
+        logger.info(f"Chat {chat_id}: summary changed during refresh, retrying")
+
+async def stream_completion(messages_to_process: List[Dict]):
+    timer = metrics.StreamTimer(model_name)
+    parts: List[str] = []
+    outcome = "error"
     try:
         openai_response_stream = await get_openai_streaming_response([schemas.Message(**msg) for msg in messages_to_process])
-        async for chunk in stream_processor(openai_response_stream):
-            yield chunk.encode("utf-8")
-    except HTTPException as e:
-        print("checkpoint 1")
-        raise e
+        async for delta in stream_processor(openai_response_stream):
+            timer.first_token()
+            parts.append(delta)
+            yield delta
+        outcome = "ok"
+    except GeneratorExit:
+        outcome = "abandoned"
+        raise
+    finally:
+        timer.finish(count_tokens("".join(parts)) - MESSAGE_TOKEN_OVERHEAD if parts else 0, outcome)
+
+async def generate_response(messages_to_process: List[Dict]):
+    try:
+        # Identical prompts are answered from the completion cache when CHAT_RESPONSE_CACHE is on
+        key = completion_key(SYSTEM_PROMPT, model_name, messages_to_process)
+        async for delta in completion_cache.stream(key, lambda: stream_completion(messages_to_process)):
+            yield delta
+    except HTTPException:
+        raise
     except Exception as e:
-        print("checkpoint 2")
         logger.error(f"Error getting OpenAI streaming response: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error processing your request: {e}")
 
 @router.post("/", response_class=StreamingResponse)
-async def chat(request: schemas.ChatRequest, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    await check_rate_limit(current_user.id)
+@no_compression
+async def chat(
+    request: schemas.ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_user),
+    rate_limit: ratelimit.RateLimitResult = Depends(chat_rate_limit),
+):
+    request_started = time.perf_counter()
     chat_id = request.chat_id
     user_message = schemas.Message(role="user", content=request.message).model_dump()
     current_history_id: Optional[uuid.UUID] = None
     initial_messages: List[Dict] = []
+    prompt_tokens: Optional[int] = None
+    title_task: Optional[asyncio.Task] = None
 
     if chat_id:
-        history = db.query(models.ChatHistory).filter(
+        history = (await db.execute(select(models.ChatHistory).where(
             models.ChatHistory.id == chat_id, models.ChatHistory.user_id == current_user.id
-        ).first()
-        print(f"Chat ID: {chat_id}")
+        ))).scalars().first()
+        logger.debug(f"Chat ID: {chat_id}")
         if not history:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat history not found")
-        initial_messages = history.messages.copy()
-        initial_messages.append(user_message)
-        history.messages = initial_messages
-        db.add(history)
-        db.commit()
+        # The previous answer may still be in the write-behind queue
+        await persistence_worker.wait_for(history.id)
+        stored_messages = await load_context_messages(db, history)
+        next_seq = stored_messages[-1]["seq"] + 1 if stored_messages else (history.summary_upto_seq or 0)
+        stored_messages.append({"seq": next_seq, **user_message, "token_count": count_tokens(request.message)})
+        summary, covered, folded = history.summary, history.summary_upto_seq or 0, 0
+        initial_messages, first_kept_seq, context_stats = build_context(stored_messages, summary)
+        if context_stats["dropped_messages"]:
+            # Ends the transaction (committing the token_count backfill) so no connection or row
+            # lock is held while the summary call runs
+            await db.commit()
+        while context_stats["dropped_messages"]:
+            # Messages leaving the window are folded into the summary before the prompt is sent,
+            # so each one is always in one or the other; a longer summary can push out more
+            _, fold_upto, _ = build_context(stored_messages, summary, int(CHAT_CONTEXT_TOKEN_BUDGET * CHAT_SUMMARY_LOW_WATER))
+            try:
+                summary, covered = await refresh_summary(history.id, fold_upto)
+            except Exception as e:
+                logger.error(f"Summary refresh failed for chat {history.id}, sending the truncated context: {e}")
+                break
+            if covered < first_kept_seq:
+                break
+            remaining = [m for m in stored_messages if m["seq"] >= covered]
+            folded += len(stored_messages) - len(remaining)
+            stored_messages = remaining
+            initial_messages, first_kept_seq, context_stats = build_context(stored_messages, summary)
+        prompt_tokens = context_stats["prompt_tokens"]
+        logger.info(
+            f"Chat {history.id} context: {context_stats['prompt_tokens']}/{CHAT_CONTEXT_TOKEN_BUDGET} tokens, "
+            f"{context_stats['kept_messages']} kept, {folded} folded into the summary, "
+            f"summary {'covering seq < ' + str(covered) if summary else 'unused'}"
+        )
+        await append_message(db, history.id, user_message)
+        await db.commit()
         current_history_id = history.id
     else:
-        history = models.ChatHistory(user_id=current_user.id, messages=[user_message], id=uuid.uuid4())
+        history = models.ChatHistory(user_id=current_user.id, id=uuid.uuid4())
         db.add(history)
-        db.commit()
+        db.add(models.ChatMessage(chat_id=history.id, seq=0, user_id=current_user.id, role=user_message["role"], content=user_message["content"], token_count=count_tokens(request.message)))
+        await db.commit()
         current_history_id = history.id
         initial_messages = [user_message] # Start with the user's message
 
+        # Runs concurrently with the answer stream and is delivered as a trailing event
+        title_task = asyncio.create_task(generate_title(request.message))
+
+    async def response_generator():
+        relay = StreamRelay()
         try:
-            title_response = clientTitle.chat.completions.create(model=model_name, messages=[{"role": "system", "content": TITLE_PROMPT}] + [{"role": "user", "content": request.message}])
-            if title_response.choices:
-                history.title = title_response.choices[0].message.content.strip()
-            else:
-                history.title = "New Chat..."
-        except HTTPException as e:
-            db.rollback()
-            raise e
-        except Exception as e:
-            logger.error(f"Title Generation Error: {e}")
-            history.title = "New Chat"
+            yield sse_event("meta", {"chat_id": str(current_history_id)})
+            try:
+                async for frame in relay.relay(generate_response(initial_messages)):
+                    if relay.frames == 0:
+                        time_to_first_byte = time.perf_counter() - request_started
+                        metrics.chat_time_to_first_byte.observe(time_to_first_byte)
+                        logger.info(f"Chat {current_history_id}: time to first byte {time_to_first_byte * 1000:.0f} ms")
+                    yield frame
+            except HTTPException as e:
+                yield sse_event("error", {"detail": e.detail})
+            except Exception as e:
+                logger.error(f"Chat {current_history_id}: stream failed: {e}")
+                yield sse_event("error", {"detail": "Error processing your request"})
+            if title_task is not None:
+                yield sse_event("title", {"title": await title_task})
+            yield sse_event("end", {})
         finally:
-            db.add(history)
-            db.commit()
+            # Also runs when the client disconnects; enqueueing never blocks, so nothing here awaits the database
+            full_response = relay.text
+            turn = CompletedTurn(
+                chat_id=current_history_id,
+                content=full_response or None,
+                token_count=count_tokens(full_response) if full_response else None,
+                prompt_tokens=prompt_tokens,
+            )
+            if title_task is not None:
+                if title_task.done() and not title_task.cancelled():
+                    turn.title = title_task.result()
+                else:
+                    title_task.add_done_callback(
+                        lambda task: task.cancelled() or persistence_worker.enqueue(CompletedTurn(chat_id=current_history_id, title=task.result()))
+                    )
+            if turn.content or turn.title:
+                persistence_worker.enqueue(turn)
 
-    async def response_generator():
-        yield f'{{"chat_id": "{str(current_history_id)}"}}'.encode("utf-8") + b"\n"
-        full_response = ""
-        async for chunk in generate_response(initial_messages):
-            decoded_chunk = chunk.decode("utf-8")
-            full_response += decoded_chunk
-            yield decoded_chunk.encode("utf-8")
-            # decoded_chunk = chunk.decode("utf-8")
-            # full_response += chunk
-
-            # yield f'{{"content": "{decoded_chunk}"}}'.encode("utf-8") + b"\n"
-        yield b"\n" + f'{{"end": ""}}'.encode("utf-8")
-
-        assistant_message = schemas.Message(role="assistant", content=full_response).model_dump()
-        if current_history_id:
-            history_to_update = db.query(models.ChatHistory).filter(models.ChatHistory.id == current_history_id).first()
-            if history_to_update:
-                updated_messages = history_to_update.messages.copy()
-                updated_messages.append(assistant_message)
-                history_to_update.messages = updated_messages
-                db.add(history_to_update)
-                db.commit()
-                
-    return StreamingResponse(response_generator(), media_type="text/event-stream")
-
-@router.get("/history/all")
-async def get_chat_history(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    history = db.query(models.ChatHistory).filter(models.ChatHistory.user_id == current_user.id).order_by(models.ChatHistory.created_at.desc()).all()
-    if not history:
+    return StreamingResponse(
+        response_generator(),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, **rate_limit.headers()},
+    )
+
+HISTORY_PREVIEW_CHARS = 120
+
+# Full history views have Postgres build the messages array with json_agg and splice its
+# text into the body, instead of loading ChatMessage objects and validating each one
+def messages_json(messages):
+    """Text of a JSON array of {role, content} over `messages` (ChatMessage or a subquery of it), in seq order"""
+    return json_array_text(func.json_build_object("role", messages.c.role, "content", messages.c.content), messages.c.seq)
+
+def chat_messages_json():
+    """Correlated scalar subquery: the whole conversation of the enclosing ChatHistory row"""
+    messages = models.ChatMessage.__table__
+    return (
+        select(messages_json(messages))
+        .where(messages.c.chat_id == models.ChatHistory.id)
+        .correlate(models.ChatHistory)
+        .scalar_subquery()
+    )
+
+def render_chat(row, messages) -> bytes:
+    """Same shape as schemas.ChatHistoryResponse; `messages` is JSON text"""
+    return dumps_object({
+        "id": row.id,
+        "title": row.title,
+        "messages": messages,
+        "user_id": row.user_id,
+        "created_at": row.created_at,
+    }, raw=("messages",))
+
+@router.get("/history/all", response_model=Union[List[schemas.ChatHistoryResponse], List[schemas.ChatHistorySummary]])
+async def get_chat_history(
+    response: Response,
+    view: Literal["full", "summary"] = "full",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_user),
+):
+    """
+    Chats newest first. `view=summary` returns id, title, created_at, a preview of the last
+    message and the message count without loading the conversations. Pages are keyset-paginated
+    on (created_at, id); pass the X-Next-Cursor header back as `cursor` to fetch the next one.
+    """
+    if view == "summary":
+        limit = limit or 50
+        last_message = (
+            select(func.left(models.ChatMessage.content, HISTORY_PREVIEW_CHARS))
+            .where(models.ChatMessage.chat_id == models.ChatHistory.id)
+            .order_by(models.ChatMessage.seq.desc())
+            .limit(1)
+            .correlate(models.ChatHistory)
+            .scalar_subquery()
+        )
+        # seq is contiguous from 0, so max(seq) + 1 is the count and only touches the primary key index
+        message_count = (
+            select(func.coalesce(func.max(models.ChatMessage.seq) + 1, 0))
+            .where(models.ChatMessage.chat_id == models.ChatHistory.id)
+            .correlate(models.ChatHistory)
+            .scalar_subquery()
+        )
+        query = select(
+            models.ChatHistory.id,
+            models.ChatHistory.title,
+            models.ChatHistory.created_at,
+            last_message.label("last_message_preview"),
+            message_count.label("message_count"),
+        )
+    else:
+        query = select(
+            models.ChatHistory.id,
+            models.ChatHistory.title,
+            models.ChatHistory.user_id,
+            models.ChatHistory.created_at,
+            chat_messages_json().label("messages"),
+        )
+
+    query = query.where(models.ChatHistory.user_id == current_user.id).order_by(models.ChatHistory.created_at.desc(), models.ChatHistory.id.desc())
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.where(tuple_(models.ChatHistory.created_at, models.ChatHistory.id) < tuple_(created_at, last_id))
+    if limit:
+        query = query.limit(limit)
+
+    history = (await db.execute(query)).all()
+    if limit and len(history) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(history[-1].created_at, history[-1].id)
+    if view == "summary":
+        return [row._asdict() for row in history]
+    if not history and not cursor:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No chat history found for this user")
-    return history
+    return RawJSONResponse(dumps_array(render_chat(row, row.messages) for row in history), headers=dict(response.headers))
+
+SEARCH_TITLE_BOOST = 2.0
+SEARCH_HEADLINE_OPTIONS = "MaxWords=25, MinWords=10, MaxFragments=1"
+
+# Declared before /history/{chat_id} so "search" isn't parsed as a chat id
+@router.get("/history/search", response_model=List[schemas.ChatSearchHit])
+async def search_chat_history(
+    q: str = Query(..., min_length=1, max_length=200),
+    prefix: bool = True,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_user),
+):
+    """
+    Ranked matches in the caller's message text and chat titles. Message hits carry the
+    message's seq; title hits have seq null. Snippets mark matches in <mark>.
+    """
+    tsquery = to_tsquery(q, prefix)
+    if tsquery is None:
+        return []
+    query = func.to_tsquery("english", tsquery)
+    ChatMessage, ChatHistory = models.ChatMessage, models.ChatHistory
 
-@router.get("/history/{chat_id}")
-async def get_chat_history_by_id(chat_id: uuid.UUID, db: Session = Depends(get_db)):
-    history = db.query(models.ChatHistory).filter(models.ChatHistory.id == chat_id).first()
+    # Both branches lead with user_id, so each is answered from its (user_id, tsvector) GIN index
+    message_hits = select(
+        ChatMessage.chat_id.label("chat_id"),
+        ChatMessage.seq.label("seq"),
+        ChatMessage.created_at.label("created_at"),
+        func.ts_rank_cd(ChatMessage.search_vector, query).label("rank"),
+    ).where(ChatMessage.user_id == current_user.id, ChatMessage.search_vector.op("@@")(query))
+    title_hits = select(
+        ChatHistory.id.label("chat_id"),
+        null().label("seq"),
+        ChatHistory.created_at.label("created_at"),
+        (func.ts_rank_cd(ChatHistory.title_vector, query) * SEARCH_TITLE_BOOST).label("rank"),
+    ).where(ChatHistory.user_id == current_user.id, ChatHistory.title_vector.op("@@")(query))
+    hits = union_all(message_hits, title_hits).subquery()
+    page = (
+        select(hits)
+        .order_by(hits.c.rank.desc(), hits.c.created_at.desc().nullslast(), hits.c.chat_id, hits.c.seq)
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+
+    # Headlines are built for the page only
+    snippet = case(
+        (page.c.seq.is_(None), headline(func.coalesce(ChatHistory.title, ""), query, SEARCH_HEADLINE_OPTIONS)),
+        else_=headline(ChatMessage.content, query, SEARCH_HEADLINE_OPTIONS),
+    )
+    rows = await db.execute(
+        select(page.c.chat_id, ChatHistory.title, page.c.seq, ChatMessage.role, snippet.label("snippet"), page.c.rank, page.c.created_at)
+        .join(ChatHistory, ChatHistory.id == page.c.chat_id)
+        .outerjoin(ChatMessage, and_(ChatMessage.chat_id == page.c.chat_id, ChatMessage.seq == page.c.seq))
+        .order_by(page.c.rank.desc(), page.c.created_at.desc().nullslast(), page.c.chat_id, page.c.seq)
+    )
+    return [{**row._asdict(), "snippet": render_headline(row.snippet)} for row in rows]
+
+@router.get("/history/{chat_id}", response_model=schemas.ChatHistoryResponse)
+async def get_chat_history_by_id(
+    chat_id: uuid.UUID,
+    response: Response,
+    before: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_user),
+):
+    """
+    Returns the whole conversation, or with `limit` only the latest messages before seq `before`.
+    When older messages remain, X-Messages-Before holds the value to pass as `before` for the next page.
+    Both views are 404 only when the user has no chat with this id; an empty page is still 200.
+    """
+    columns = (models.ChatHistory.id, models.ChatHistory.title, models.ChatHistory.user_id, models.ChatHistory.created_at)
+    full = before is None and limit is None
+    query = select(*columns, chat_messages_json().label("messages")) if full else select(*columns)
+    history = (await db.execute(query.where(
+        models.ChatHistory.id == chat_id, models.ChatHistory.user_id == current_user.id
+    ))).first()
     if not history:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Chat history with id '{chat_id}' not found")
-    return history
+    if full:
+        return RawJSONResponse(render_chat(history, history.messages))
+
+    limit = limit or 50
+    query = select(models.ChatMessage.seq, models.ChatMessage.role, models.ChatMessage.content).where(models.ChatMessage.chat_id == chat_id)
+    if before is not None:
+        query = query.where(models.ChatMessage.seq < before)
+    window = query.order_by(models.ChatMessage.seq.desc()).limit(limit).subquery()
+    messages, first_seq = (await db.execute(select(messages_json(window), func.min(window.c.seq)))).one()
+    headers = {"X-Messages-Before": str(first_seq)} if first_seq else None
+    return RawJSONResponse(render_chat(history, messages), headers=headers)
 
 @router.delete("/history/all", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_chat_history(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    history = db.query(models.ChatHistory).filter( models.ChatHistory.user_id == current_user.id).all()
+async def delete_chat_history(db: AsyncSession = Depends(get_async_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    history = (await db.execute(select(models.ChatHistory).where(models.ChatHistory.user_id == current_user.id))).scalars().all()
     if not history:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No Chat history found")
     for hist in history:
-        db.delete(hist)
-    db.commit()
\ No newline at end of file
+        await db.delete(hist)
+    await db.commit()
\ No newline at end of file
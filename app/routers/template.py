@@ -1,14 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_, select, update, func
+from sqlalchemy.orm import Session, load_only, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, List, Dict, Any, Optional, Tuple, Literal
 from uuid import UUID
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import itertools
 import json
+import os
 from .. import models, schemas, auth
-from ..db import get_db
+from ..db import get_db, get_async_db
+from ..sfdt import TemplateNotLoaded, compile_template, extract_text, render_template, render_batch_lines, render_cached_batch_lines, render_loaded_batch_lines
+from ..search import build_index, headline, render_headline, to_tsquery
+from ..cache import catalogue_cache, invalidate_catalogue, TEMPLATES
+from ..compression import no_compression
+from ..etag import cache_headers, content_hash, if_none_match, make_etag, not_modified, template_content_hash
+from ..pagination import encode_cursor, decode_cursor
+from ..rawjson import RawJSONResponse, as_json_text, dumps_object
+from ..uploads import FIELDS_SCHEMA_MAX_BYTES, TEMPLATE_CONTENT_MAX_BYTES, check_document, read_json_upload
+from ..validators import validate_fields_schema, validate_sfdt
 # from ..auth import auth
 
 router = APIRouter(prefix="/template", tags=['Templates'])
 
+# Batches at or above this size are rendered in a process pool, in chunks
+BATCH_POOL_THRESHOLD = int(os.getenv("TEMPLATE_BATCH_POOL_THRESHOLD", "50"))
+BATCH_CHUNK_SIZE = int(os.getenv("TEMPLATE_BATCH_CHUNK_SIZE", "25"))
+BATCH_MAX_WORKERS = int(os.getenv("TEMPLATE_BATCH_MAX_WORKERS", "0")) or None
+# Chunks of one batch submitted at a time; the rest wait here, so a disconnect stops them
+BATCH_MAX_IN_FLIGHT = int(os.getenv("TEMPLATE_BATCH_MAX_IN_FLIGHT", "0")) or BATCH_MAX_WORKERS or os.cpu_count() or 1
+_batch_pool: Optional[ProcessPoolExecutor] = None
+
+def get_batch_pool() -> ProcessPoolExecutor:
+    global _batch_pool
+    if _batch_pool is None:
+        _batch_pool = ProcessPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+    return _batch_pool
+
+def shutdown_batch_pool() -> None:
+    global _batch_pool
+    if _batch_pool is not None:
+        _batch_pool.shutdown(wait=True, cancel_futures=True)
+        _batch_pool = None
+
+# Keeps the generated tsvector well under Postgres' 1 MB limit for very long documents
+SEARCH_TEXT_MAX_CHARS = int(os.getenv("TEMPLATE_SEARCH_TEXT_MAX_CHARS", "200000"))
+SEARCH_HEADLINE_OPTIONS = "MaxWords=20, MinWords=8, MaxFragments=2"
+
+def template_search_text(sfdt_content: dict) -> str:
+    return extract_text(sfdt_content)[:SEARCH_TEXT_MAX_CHARS]
+
 # --- Dependency for Protected Routes ---
 # async def get_current_active_user(current_user: models.User = Depends(auth.get_current_user)):
 #     return current_user
@@ -16,14 +59,182 @@ async def get_current_active_user():
     return True
 
 
-# --- SFDT Validation Helper ---
-def validate_sfdt(sfdt_content: dict) -> bool:
-    """Basic SFDT structure validation"""
-    if not isinstance(sfdt_content, dict):
-        return False
-    if 'sections' not in sfdt_content:
-        return False
-    return True
+# --- Cached Template Lookups ---
+def template_snapshot(db_template: models.DocumentTemplate) -> dict:
+    """Session-independent copy of a template that is safe to keep in the cache"""
+    category = db_template.category
+    return {
+        "id": db_template.id,
+        "name": db_template.name,
+        "description": db_template.description,
+        "category_id": db_template.category_id,
+        "created_at": db_template.created_at,
+        "fields_schema": db_template.fields_schema,
+        "template_content": db_template.template_content,
+        "placeholder_index": db_template.placeholder_index,
+        "content_hash": db_template.content_hash,
+        "category": {"id": category.id, "name": category.name} if category else None,
+    }
+
+def template_query():
+    return select(models.DocumentTemplate).options(joinedload(models.DocumentTemplate.category))
+
+async def aget_cached_template(db: AsyncSession, template_id: UUID) -> Optional[dict]:
+    async def load():
+        db_template = (await db.execute(template_query().where(models.DocumentTemplate.id == template_id))).scalars().first()
+        return template_snapshot(db_template) if db_template else None
+    return await catalogue_cache.aget_or_load(("template", template_id), load, namespace=TEMPLATES)
+
+# --- Raw Template Documents ---
+# Read routes select the JSONB columns as text and splice them into the response body, so
+# large SFDT trees are never decoded, validated or re-encoded. The cache holds the bytes.
+def template_document_query(*json_columns):
+    DocumentTemplate = models.DocumentTemplate
+    return select(
+        DocumentTemplate.id, DocumentTemplate.name, DocumentTemplate.description, DocumentTemplate.category_id,
+        DocumentTemplate.created_at, DocumentTemplate.content_hash,
+        models.TemplateCategory.id.label("category_pk"), models.TemplateCategory.name.label("category_name"),
+        *(as_json_text(column).label(column.key) for column in json_columns),
+    ).outerjoin(DocumentTemplate.category)
+
+def render_template_document(row) -> bytes:
+    """Same shape as schemas.DocumentTemplateRead"""
+    return dumps_object({
+        "name": row.name,
+        "description": row.description,
+        "category_id": row.category_id,
+        "id": row.id,
+        "created_at": row.created_at,
+        "fields_schema": row.fields_schema,
+        "template_content": row.template_content,
+        "category": {"id": row.category_pk, "name": row.category_name} if row.category_pk else None,
+    }, raw=("fields_schema", "template_content"))
+
+def get_cached_template_document(db: Session, condition, cache_key: tuple) -> Optional[dict]:
+    def load():
+        DocumentTemplate = models.DocumentTemplate
+        row = db.execute(template_document_query(DocumentTemplate.fields_schema, DocumentTemplate.template_content).where(condition)).first()
+        return {"body": render_template_document(row), "version": (row.content_hash, row.category_name)} if row else None
+    return catalogue_cache.get_or_load(cache_key, load, namespace=TEMPLATES)
+
+def get_cached_schema_document(db: Session, template_id: UUID) -> Optional[dict]:
+    """Only fields_schema is read; template_content stays in the database"""
+    def load():
+        DocumentTemplate = models.DocumentTemplate
+        row = db.execute(template_document_query(DocumentTemplate.fields_schema).where(DocumentTemplate.id == template_id)).first()
+        if row is None:
+            return None
+        return {"body": dumps_object({"fields_schema": row.fields_schema}, raw=("fields_schema",)), "version": (row.content_hash, row.category_name)}
+    return catalogue_cache.get_or_load(("template_schema_document", template_id), load, namespace=TEMPLATES)
+
+# --- Conditional GETs ---
+TemplateVersion = Tuple[Optional[str], Optional[str]]  # (content_hash, category name)
+
+def template_version_query():
+    """Just the hash and the category name, so revalidation never reads the JSONB columns"""
+    return select(models.DocumentTemplate.content_hash, models.TemplateCategory.name).outerjoin(models.DocumentTemplate.category)
+
+def get_cached_template_version(db: Session, template_id: UUID) -> Optional[TemplateVersion]:
+    def load():
+        row = db.execute(template_version_query().where(models.DocumentTemplate.id == template_id)).first()
+        return tuple(row) if row else None
+    return catalogue_cache.get_or_load(("template_version", template_id), load, namespace=TEMPLATES)
+
+def get_cached_template_version_by_name(db: Session, template_name: str) -> Optional[TemplateVersion]:
+    def load():
+        row = db.execute(template_version_query().where(models.DocumentTemplate.name == template_name)).first()
+        return tuple(row) if row else None
+    return catalogue_cache.get_or_load(("template_version_name", template_name), load, namespace=TEMPLATES)
+
+def template_etag(version: TemplateVersion, representation: str) -> Optional[str]:
+    content_hash, category_name = version
+    # The category name is part of the template response, so renaming the category changes the ETag
+    return make_etag(content_hash, category_name, representation) if content_hash else None
+
+def unchanged_template(request: Request, load_version: Callable[[], Optional[TemplateVersion]], representation: str) -> Optional[Response]:
+    """A 304 when the client's ETag is still current, else None"""
+    if not request.headers.get("if-none-match"):
+        return None
+    version = load_version()
+    etag = template_etag(version, representation) if version else None
+    if etag and if_none_match(request, etag):
+        return not_modified(etag)
+    return None
+
+def template_document_response(document: dict, representation: str) -> RawJSONResponse:
+    etag = template_etag(document["version"], representation)
+    return RawJSONResponse(document["body"], headers=cache_headers(etag) if etag else None)
+
+async def load_template_for_response(db: AsyncSession, template_id: UUID) -> models.DocumentTemplate:
+    """Reload a just-written template with its category so serialization never lazy-loads"""
+    stmt = template_query().where(models.DocumentTemplate.id == template_id).execution_options(populate_existing=True)
+    return (await db.execute(stmt)).scalars().one()
+
+
+async def ensure_placeholder_index(db: AsyncSession, db_template: dict) -> list:
+    placeholder_index = db_template["placeholder_index"]
+    if placeholder_index is None:
+        # Templates saved before compilation existed are compiled once here
+        placeholder_index = compile_template(db_template["template_content"])
+        db_template["placeholder_index"] = placeholder_index
+        await db.execute(
+            update(models.DocumentTemplate)
+            .where(models.DocumentTemplate.id == db_template["id"])
+            .values(placeholder_index=placeholder_index)
+        )
+        await db.commit()
+    return placeholder_index
+
+def batch_template_key(db_template: dict) -> tuple:
+    """Identifies a template's content in the batch workers' caches"""
+    if db_template.get("content_hash") is None:
+        # Rows written before content hashes existed; hashed once per cached snapshot
+        db_template["content_hash"] = content_hash([db_template["template_content"], db_template["placeholder_index"]])
+    return (db_template["id"], db_template["content_hash"])
+
+
+# --- Template Listing Helpers ---
+TEMPLATE_LIST_FIELDS = ("id", "name", "description", "category_id", "created_at", "fields_schema", "template_content", "category")
+TEMPLATE_SUMMARY_FIELDS = ("id", "name", "description", "category", "created_at")
+
+def list_templates(db: Session, response: Response, filters: list, view: str, fields: Optional[str], cursor: Optional[str], skip: int, limit: int):
+    """
+    Keyset-paginated template listing on (created_at, id). The next page's cursor is returned
+    in the X-Next-Cursor header. `view=summary` or an explicit `fields` list loads only the
+    requested columns, so the JSONB bodies are never read unless asked for.
+    """
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = set(selected) - set(TEMPLATE_LIST_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        selected = ["id"] + [f for f in selected if f != "id"]
+    elif view == "summary":
+        selected = list(TEMPLATE_SUMMARY_FIELDS)
+    else:
+        selected = None
+
+    query = db.query(models.DocumentTemplate).filter(*filters)
+    if selected is not None:
+        columns = {"id", "created_at"} | {f for f in selected if f != "category"}
+        if "category" in selected:
+            columns.add("category_id")
+            query = query.options(joinedload(models.DocumentTemplate.category))
+        query = query.options(load_only(*(getattr(models.DocumentTemplate, c) for c in columns)))
+
+    query = query.order_by(models.DocumentTemplate.created_at, models.DocumentTemplate.id)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(tuple_(models.DocumentTemplate.created_at, models.DocumentTemplate.id) > tuple_(created_at, last_id))
+    elif skip:
+        query = query.offset(skip)
+    rows = query.limit(limit).all()
+
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    if selected is None:
+        return rows
+    return [{f: getattr(row, f) for f in selected} for row in rows]
 
 
 # --- DocumentTemplate Routes ---
@@ -35,10 +246,10 @@ async def create_template(
     fields_schema_file: UploadFile = File(...),
     template_content_file: UploadFile = File(...),
     category_id: UUID = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: bool = Depends(get_current_active_user),
 ):
-    existing_template = db.query(models.DocumentTemplate).filter(models.DocumentTemplate.name == name).first()
+    existing_template = (await db.execute(select(models.DocumentTemplate.id).where(models.DocumentTemplate.name == name))).first()
     if existing_template:
         raise HTTPException(status_code=400, detail=f"Template with name '{name}' already exists")
 
@@ -49,40 +260,117 @@ async def create_template(
         raise HTTPException(status_code=400, detail="Template content must be SFDT JSON")
 
     try:
-        # Parse and validate fields schema
-        fields_schema_content = await fields_schema_file.read()
-        fields_schema = json.loads(fields_schema_content.decode("utf-8"))
-        
-        # Parse and validate SFDT
-        sfdt_content = json.loads((await template_content_file.read()).decode("utf-8"))
-        if not validate_sfdt(sfdt_content):
-            raise HTTPException(status_code=400, detail="Invalid SFDT structure")
-            
+        fields_schema = await read_json_upload(fields_schema_file, FIELDS_SCHEMA_MAX_BYTES, "Fields schema")
+        sfdt_content = await read_json_upload(template_content_file, TEMPLATE_CONTENT_MAX_BYTES, "Template content")
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON format")
+    check_document(validate_fields_schema, fields_schema, "fields schema")
+    check_document(validate_sfdt, sfdt_content, "SFDT structure")
 
     db_template = models.DocumentTemplate(
         name=name,
         description=description,
         fields_schema=fields_schema,
         template_content=sfdt_content,  # Store as JSON
+        placeholder_index=compile_template(sfdt_content),
+        search_text=template_search_text(sfdt_content),
         category_id=category_id,
     )
+    db_template.content_hash = template_content_hash(name, description, category_id, fields_schema, sfdt_content)
     db.add(db_template)
-    db.commit()
-    db.refresh(db_template)
-    return db_template
+    await db.commit()
+    invalidate_catalogue()
+    return await load_template_for_response(db, db_template.id)
 
-@router.get("/get/all", response_model=List[schemas.DocumentTemplateRead])
-def read_templates(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
-    return db.query(models.DocumentTemplate).offset(skip).limit(limit).all()
+@router.get("/get/all", response_model=List[schemas.DocumentTemplateListItem], response_model_exclude_unset=True)
+def read_templates(
+    response: Response,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: bool = Depends(get_current_active_user),
+):
+    return list_templates(db, response, [], view, fields, cursor, skip, limit)
+
+@router.get("/search", response_model=List[schemas.TemplateSearchHit])
+async def search_templates(
+    q: str = Query(..., min_length=1, max_length=200),
+    category_id: Optional[UUID] = None,
+    prefix: bool = True,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: bool = Depends(get_current_active_user),
+):
+    """
+    Ranks templates by name (highest weight), description and document text. Every word must
+    match; with `prefix` each word also matches longer words. Highlights mark matches in <mark>.
+    """
+    tsquery = to_tsquery(q, prefix)
+    if tsquery is None:
+        return []
+
+    if db.bind.dialect.name != "postgresql":
+        return await search_templates_in_process(db, q, prefix, category_id, limit, offset)
+
+    DocumentTemplate = models.DocumentTemplate
+    query = func.to_tsquery("english", tsquery)
+    rank = func.ts_rank_cd(DocumentTemplate.search_vector, query)
+    filters = [DocumentTemplate.search_vector.op("@@")(query)]
+    if category_id:
+        filters.append(DocumentTemplate.category_id == category_id)
+    ranked = (
+        select(DocumentTemplate.id, DocumentTemplate.name, DocumentTemplate.description, DocumentTemplate.category_id, DocumentTemplate.search_text, rank.label("rank"))
+        .where(*filters)
+        .order_by(rank.desc(), DocumentTemplate.id)
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    # ts_headline re-parses the text, so it only runs for the page of results
+    highlight = headline(func.coalesce(ranked.c.search_text, ranked.c.description, ""), query, SEARCH_HEADLINE_OPTIONS)
+    rows = await db.execute(
+        select(ranked.c.id, ranked.c.name, ranked.c.description, ranked.c.category_id, ranked.c.rank, highlight.label("highlight"))
+        .order_by(ranked.c.rank.desc(), ranked.c.id)
+    )
+    return [{**row._asdict(), "highlight": render_headline(row.highlight)} for row in rows]
+
+async def search_templates_in_process(db: AsyncSession, q: str, prefix: bool, category_id: Optional[UUID], limit: int, offset: int) -> List[dict]:
+    """Inverted-index fallback for databases without Postgres full-text search"""
+    async def load():
+        rows = await db.execute(select(
+            models.DocumentTemplate.id, models.DocumentTemplate.name, models.DocumentTemplate.description,
+            models.DocumentTemplate.category_id, models.DocumentTemplate.search_text,
+        ))
+        return build_index(row._asdict() for row in rows)
+
+    index = await catalogue_cache.aget_or_load(("template_search_index",), load, namespace=TEMPLATES)
+    hits = index.search(q, prefix, {"category_id": category_id} if category_id else None, limit, offset)
+    results = []
+    for template_id, score, highlight in hits:
+        document = index.document(template_id)
+        results.append({
+            "id": template_id,
+            "name": document["fields"]["name"],
+            "description": document["fields"]["description"],
+            "category_id": document["attributes"]["category_id"],
+            "rank": score,
+            "highlight": highlight,
+        })
+    return results
 
 @router.get("/get/{template_id}", response_model=schemas.DocumentTemplateRead)
-def read_template(template_id: UUID, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
-    db_template = db.query(models.DocumentTemplate).filter(models.DocumentTemplate.id == template_id).first()
-    if not db_template:
+def read_template(template_id: UUID, request: Request, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
+    unchanged = unchanged_template(request, lambda: get_cached_template_version(db, template_id), "template")
+    if unchanged:
+        return unchanged
+    document = get_cached_template_document(db, models.DocumentTemplate.id == template_id, ("template_document", template_id))
+    if not document:
         raise HTTPException(status_code=404, detail="Template not found")
-    return db_template
+    return template_document_response(document, "template")
 
 @router.put("/update/{template_id}", response_model=schemas.DocumentTemplateRead, dependencies=[Depends(get_current_active_user)])
 async def update_template(
@@ -92,10 +380,10 @@ async def update_template(
     fields_schema_file: Optional[UploadFile] = File(None),
     template_content_file: Optional[UploadFile] = File(None),
     category_id: Optional[UUID] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: bool = Depends(get_current_active_user),
 ):
-    db_template = db.query(models.DocumentTemplate).filter(models.DocumentTemplate.id == template_id).first()
+    db_template = await db.get(models.DocumentTemplate, template_id)
     if not db_template:
         raise HTTPException(status_code=404, detail="Template not found")
 
@@ -103,21 +391,23 @@ async def update_template(
         if fields_schema_file.content_type != "application/json":
             raise HTTPException(status_code=400, detail="Fields schema file must be JSON")
         try:
-            fields_schema_content = await fields_schema_file.read()
-            db_template.fields_schema = json.loads(fields_schema_content.decode("utf-8"))
+            fields_schema = await read_json_upload(fields_schema_file, FIELDS_SCHEMA_MAX_BYTES, "Fields schema")
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in fields schema")
+        check_document(validate_fields_schema, fields_schema, "fields schema")
+        db_template.fields_schema = fields_schema
 
     if template_content_file:
         if template_content_file.content_type != "application/json":
             raise HTTPException(status_code=400, detail="Template content must be SFDT JSON")
         try:
-            sfdt_content = json.loads((await template_content_file.read()).decode("utf-8"))
-            if not validate_sfdt(sfdt_content):
-                raise HTTPException(status_code=400, detail="Invalid SFDT structure")
-            db_template.template_content = sfdt_content
+            sfdt_content = await read_json_upload(template_content_file, TEMPLATE_CONTENT_MAX_BYTES, "Template content")
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid SFDT JSON")
+        check_document(validate_sfdt, sfdt_content, "SFDT structure")
+        db_template.template_content = sfdt_content
+        db_template.placeholder_index = compile_template(sfdt_content)
+        db_template.search_text = template_search_text(sfdt_content)
 
     if name:
         db_template.name = name
@@ -125,10 +415,13 @@ async def update_template(
         db_template.description = description
     if category_id:
         db_template.category_id = category_id
+    db_template.content_hash = template_content_hash(
+        db_template.name, db_template.description, db_template.category_id, db_template.fields_schema, db_template.template_content
+    )
 
-    db.commit()
-    db.refresh(db_template)
-    return db_template
+    await db.commit()
+    invalidate_catalogue()
+    return await load_template_for_response(db, template_id)
 
 # @router.delete("/delete/all", dependencies=[Depends(get_current_active_user)])
 # def delete_template(db: Session = Depends(get_db)):
@@ -148,6 +441,7 @@ def delete_template(template_id: UUID, db: Session = Depends(get_db), current_us
         raise HTTPException(status_code=404, detail="Template not found")
     db.delete(db_template)
     db.commit()
+    invalidate_catalogue()
     return db_template
 
 # --- SFDT Processing Endpoint ---
@@ -155,55 +449,160 @@ def delete_template(template_id: UUID, db: Session = Depends(get_db), current_us
 async def process_sfdt_template(
     template_id: UUID,
     field_data: Dict[str, str],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: bool = Depends(get_current_active_user),
 ):
     """
     Populates SFDT template with field data and returns modified SFDT
     """
-    db_template = db.query(models.DocumentTemplate).filter(models.DocumentTemplate.id == template_id).first()
+    db_template = await aget_cached_template(db, template_id)
     if not db_template:
         raise HTTPException(status_code=404, detail="Template not found")
 
-    # Deep copy the SFDT content
-    processed_sfdt = json.loads(json.dumps(db_template.template_content))
-    
-    # Recursive placeholder replacement
-    def replace_placeholders(obj):
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                if isinstance(v, str):
-                    for field, value in field_data.items():
-                        obj[k] = v.replace(f"{{{{{field}}}}}", value)
-                else:
-                    replace_placeholders(v)
-        elif isinstance(obj, list):
-            for item in obj:
-                replace_placeholders(item)
-    
-    replace_placeholders(processed_sfdt)
-    
+    placeholder_index = await ensure_placeholder_index(db, db_template)
+    processed_sfdt = render_template(db_template["template_content"], placeholder_index, field_data)
+
     return {"processed_sfdt": processed_sfdt}
 
 
+async def read_batch_records(request: Request) -> Tuple[List[Tuple[int, Any]], List[Tuple[int, str]]]:
+    """
+    Accepts a JSON array, an NDJSON body, or an NDJSON file uploaded as `records_file`.
+    Returns the parsed records and the lines that failed to parse, both tagged with their position.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            records = json.loads(await request.body())
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON format")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of field_data records")
+        return list(enumerate(records)), []
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        records_file = form.get("records_file")
+        if records_file is None or isinstance(records_file, str):
+            raise HTTPException(status_code=400, detail="records_file upload is required")
+        lines = (await records_file.read()).splitlines()
+    else:
+        lines = (await request.body()).splitlines()
+
+    records, invalid = [], []
+    for position, line in enumerate(line for line in lines if line.strip()):
+        try:
+            records.append((position, json.loads(line)))
+        except json.JSONDecodeError as e:
+            # Reported as a failed record rather than rejecting the whole batch
+            invalid.append((position, f"Invalid JSON: {e}"))
+    return records, invalid
+
+
+@router.post("/{template_id}/process/batch", response_class=StreamingResponse)
+@no_compression
+async def process_sfdt_template_batch(
+    template_id: UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: bool = Depends(get_current_active_user),
+):
+    """
+    Populates one template for many field_data records, streaming one NDJSON line per record
+    """
+    db_template = await aget_cached_template(db, template_id)
+    if not db_template:
+        raise HTTPException(status_code=404, detail="Template not found")
+    placeholder_index = await ensure_placeholder_index(db, db_template)
+    sfdt_content = db_template["template_content"]
+    records, invalid = await read_batch_records(request)
+
+    async def line_generator():
+        failed = len(invalid)
+        for position, message in invalid:
+            yield json.dumps({"index": position, "error": message}) + "\n"
+
+        if len(records) < BATCH_POOL_THRESHOLD:
+            # Off the event loop: rendering and encoding a large document takes a while even for one record
+            for record in records:
+                ok, line = (await asyncio.to_thread(render_batch_lines, sfdt_content, placeholder_index, [record]))[0]
+                failed += not ok
+                yield line + "\n"
+        else:
+            loop = asyncio.get_running_loop()
+            pool = get_batch_pool()
+            key = batch_template_key(db_template)
+            chunks = iter([records[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(records), BATCH_CHUNK_SIZE)])
+
+            async def run_chunk(chunk):
+                try:
+                    try:
+                        return await loop.run_in_executor(pool, render_cached_batch_lines, key, chunk)
+                    except TemplateNotLoaded:
+                        return await loop.run_in_executor(pool, render_loaded_batch_lines, key, sfdt_content, placeholder_index, chunk)
+                except Exception as e:
+                    return [(False, json.dumps({"index": position, "error": f"Worker failed: {e}"})) for position, _ in chunk]
+
+            def submit(count):
+                for chunk in itertools.islice(chunks, count):
+                    running.add(asyncio.ensure_future(run_chunk(chunk)))
+
+            running = set()
+            submit(BATCH_MAX_IN_FLIGHT)
+            try:
+                # Chunks are streamed as they finish, not in submission order
+                while running:
+                    done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    submit(len(done))
+                    for task in done:
+                        for ok, line in task.result():
+                            failed += not ok
+                            yield line + "\n"
+            finally:
+                # On disconnect only the chunks in flight are cancelled; the rest were never submitted
+                for task in running:
+                    task.cancel()
+
+        total = len(records) + len(invalid)
+        yield json.dumps({"done": True, "processed": total - failed, "failed": failed}) + "\n"
+
+    return StreamingResponse(line_generator(), media_type="application/x-ndjson")
+
+
 # --- Additional Template Routes (Potentially Useful) ---
 
-@router.get("/{category_id}/templates/", response_model=List[schemas.DocumentTemplateRead])
-def read_templates_by_category(category_id: UUID, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
-    templates = db.query(models.DocumentTemplate).filter(models.DocumentTemplate.category_id == category_id).offset(skip).limit(limit).all()
-    return templates
+@router.get("/{category_id}/templates/", response_model=List[schemas.DocumentTemplateListItem], response_model_exclude_unset=True)
+def read_templates_by_category(
+    category_id: UUID,
+    response: Response,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: bool = Depends(get_current_active_user),
+):
+    filters = [models.DocumentTemplate.category_id == category_id]
+    return list_templates(db, response, filters, view, fields, cursor, skip, limit)
 
 @router.get("/by_name/{template_name}", response_model=schemas.DocumentTemplateRead)
-def read_template_by_name(template_name: str, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
-    db_template = db.query(models.DocumentTemplate).filter(models.DocumentTemplate.name == template_name).first()
-    if db_template is None:
+def read_template_by_name(template_name: str, request: Request, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
+    unchanged = unchanged_template(request, lambda: get_cached_template_version_by_name(db, template_name), "template")
+    if unchanged:
+        return unchanged
+    document = get_cached_template_document(db, models.DocumentTemplate.name == template_name, ("template_document_name", template_name))
+    if document is None:
         raise HTTPException(status_code=404, detail="Template not found")
-    return db_template
+    return template_document_response(document, "template")
 
 # --- Route to get the schema for a specific template ---
 @router.get("/{template_id}/schema", response_model=schemas.TemplateSchemaResponse)
-def read_template_schema(template_id: UUID, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
-    db_template = db.query(models.DocumentTemplate).filter(models.DocumentTemplate.id == template_id).first()
-    if db_template is None:
+def read_template_schema(template_id: UUID, request: Request, db: Session = Depends(get_db), current_user: bool = Depends(get_current_active_user)):
+    unchanged = unchanged_template(request, lambda: get_cached_template_version(db, template_id), "schema")
+    if unchanged:
+        return unchanged
+    document = get_cached_schema_document(db, template_id)
+    if document is None:
         raise HTTPException(status_code=404, detail="Template not found")
-    return {"fields_schema": db_template.fields_schema}
+    return template_document_response(document, "schema")
@@ -1,28 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas, auth
-from ..db import get_db
+from ..db import get_async_db
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+async def read_users_me(current_user: auth.Principal = Depends(auth.get_current_user)):
     return current_user
 
 @router.put("/me", response_model=schemas.User)
-async def update_user_me(user: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_user = db.query(models.User).filter((models.User.username == user.username) & (models.User.id != current_user.id)).first()
+async def update_user_me(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db), current_user: auth.Principal = Depends(auth.get_current_user)):
+    db_user = (await db.execute(select(models.User).where((models.User.username == user.username) & (models.User.id != current_user.id)))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Username already in use")
 
-    db_user = db.query(models.User).filter((models.User.email == user.email) & (models.User.id != current_user.id)).first()
+    db_user = (await db.execute(select(models.User).where((models.User.email == user.email) & (models.User.id != current_user.id)))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already in use")
 
-    current_user.username = user.username
-    current_user.email = user.email
-    current_user.hashed_password = auth.get_password_hash(user.password)
+    db_user = await db.get(models.User, current_user.id)
+    db_user.username = user.username
+    db_user.email = user.email
+    # Only hashed when the password actually changed (or its hash needs a cost upgrade)
+    new_hash = await auth.replacement_password_hash(user.password, db_user.hashed_password)
+    if new_hash:
+        db_user.hashed_password = new_hash
 
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    auth.invalidate_principal(db_user.id)
+    return db_user
@@ -27,6 +27,9 @@ class Message(BaseModel):
     role: str
     content: str
 
+    class Config:
+        from_attributes = True
+
 class ChatRequest(BaseModel):
     chat_id: Optional[uuid.UUID] = None
     message: str
@@ -42,10 +45,18 @@ class ChatHistoryResponse(BaseModel):
     title: Optional[str] = None
     messages: List[Message]
     user_id: uuid.UUID
+    created_at: Optional[datetime.datetime] = None
 
     class Config:
         from_attributes = True
 
+class ChatHistorySummary(BaseModel):
+    id: uuid.UUID
+    title: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    last_message_preview: Optional[str]
+    message_count: int
+
 
 class TemplateCategoryBase(BaseModel):
     name: str
@@ -106,6 +117,53 @@ class DocumentTemplateReadWithoutCategory(DocumentTemplateBase):
     class Config:
         from_attributes = True
 
+class ChatSearchHit(BaseModel):
+    chat_id: uuid.UUID
+    title: Optional[str] = None
+    seq: Optional[int] = None  # Position of the matching message; None when the title matched
+    role: Optional[str] = None
+    snippet: Optional[str] = None
+    rank: float
+    created_at: Optional[datetime.datetime] = None
+
+class DocumentTemplateListItem(BaseModel):
+    """Listing row; only the selected fields are set, unset ones are left out of the response"""
+    id: uuid.UUID
+    name: Optional[str] = None
+    description: Optional[str] = None
+    category_id: Optional[uuid.UUID] = None
+    created_at: Optional[datetime.datetime] = None
+    fields_schema: Optional[Dict[str, Any]] = None
+    template_content: Optional[dict] = None
+    category: Optional["TemplateCategoryReadWithoutTemplates"] = None
+
+    class Config:
+        from_attributes = True
+
+class DocumentTemplateSummary(BaseModel):
+    id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    created_at: datetime.datetime
+
+    class Config:
+        from_attributes = True
+
+class TemplateSearchHit(BaseModel):
+    id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    category_id: Optional[uuid.UUID] = None
+    rank: float
+    highlight: Optional[str] = None
+
+class TemplateCategoryTree(TemplateCategoryBase):
+    id: uuid.UUID
+    templates: List[DocumentTemplateSummary] = []
+
+    class Config:
+        from_attributes = True
+
 class TemplateCategory(TemplateCategoryBase):
     id: uuid.UUID
     templates: Optional[List["DocumentTemplateRead"]] = None
@@ -0,0 +1,159 @@
+import bisect
+import html
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Field weights mirror setweight() in the Postgres search_vector (A=1.0, B=0.4, C=0.2)
+FIELD_WEIGHTS = {"name": 1.0, "description": 0.4, "body": 0.2}
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+SNIPPET_WORDS = 20
+
+# ts_headline() copies the document text as is, so it marks matches with private-use characters
+# instead of tags; render_headline() escapes the text first and only then turns them into <mark>
+HEADLINE_START = "\ue000"
+HEADLINE_STOP = "\ue001"
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def to_tsquery(query: str, prefix: bool = True) -> Optional[str]:
+    """AND of the query's words for to_tsquery(); each word becomes `word:*` when prefix matching"""
+    terms = tokenize(query)
+    if not terms:
+        return None
+    suffix = ":*" if prefix else ""
+    return " & ".join(f"'{term}'{suffix}" for term in terms)
+
+
+def headline(text, query, options: str):
+    """ts_headline() of `text` with sentinel markers; pass the result through render_headline()"""
+    # Any sentinels already in the text are dropped, so only real matches come back marked
+    text = func.translate(text, HEADLINE_START + HEADLINE_STOP, "")
+    return func.ts_headline("english", text, query, f"StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, {options}")
+
+
+def render_headline(fragment: Optional[str]) -> Optional[str]:
+    """HTML-escaped headline with matches wrapped in <mark>, safe to render as HTML"""
+    if fragment is None:
+        return None
+    return html.escape(fragment).replace(HEADLINE_START, HIGHLIGHT_START).replace(HEADLINE_STOP, HIGHLIGHT_STOP)
+
+
+class InvertedIndex:
+    """
+    In-process stand-in for the Postgres full-text index, used when the database isn't
+    Postgres (tests, local tools). Matching is AND over query terms with optional prefix
+    expansion; scoring is field-weighted tf-idf. No stemming, so `prefix=True` does most
+    of the work that the english dictionary does in Postgres.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Hashable, Dict[str, int]]] = defaultdict(dict)
+        self._vocabulary: List[str] = []
+        self._vocabulary_stale = False
+        self._documents: Dict[Hashable, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: Hashable, fields: Dict[str, Optional[str]], attributes: Optional[Dict[str, Any]] = None) -> None:
+        if doc_id in self._documents:
+            self.remove(doc_id)
+        self._documents[doc_id] = {"fields": fields, "attributes": attributes or {}}
+        for field, text in fields.items():
+            for token in tokenize(text):
+                counts = self._postings[token].setdefault(doc_id, {})
+                counts[field] = counts.get(field, 0) + 1
+        self._vocabulary_stale = True
+
+    def document(self, doc_id: Hashable) -> Dict[str, Any]:
+        return self._documents[doc_id]
+
+    def remove(self, doc_id: Hashable) -> None:
+        if self._documents.pop(doc_id, None) is None:
+            return
+        for token in [t for t, postings in self._postings.items() if doc_id in postings]:
+            del self._postings[token][doc_id]
+            if not self._postings[token]:
+                del self._postings[token]
+        self._vocabulary_stale = True
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [term] if term in self._postings else []
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_stale = False
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff")
+        return self._vocabulary[start:end]
+
+    def search(self, query: str, prefix: bool = True, filters: Optional[Dict[str, Any]] = None, limit: int = 20, offset: int = 0) -> List[Tuple[Hashable, float, Optional[str]]]:
+        """Returns (doc_id, score, highlight) for the best matches"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        total = len(self._documents)
+        scores: Optional[Dict[Hashable, float]] = None
+        matched_tokens: Set[str] = set()
+        for term in terms:
+            term_scores: Dict[Hashable, float] = defaultdict(float)
+            for token in self._expand(term, prefix):
+                postings = self._postings[token]
+                idf = math.log(1 + total / len(postings))
+                matched_tokens.add(token)
+                for doc_id, counts in postings.items():
+                    term_scores[doc_id] += idf * sum(FIELD_WEIGHTS.get(field, 0.1) * (1 + math.log(n)) for field, n in counts.items())
+            if scores is None:
+                scores = dict(term_scores)
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                return []
+
+        if filters:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if all(self._documents[doc_id]["attributes"].get(key) == value for key, value in filters.items())
+            }
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))[offset:offset + limit]
+        return [(doc_id, score, self.highlight(doc_id, matched_tokens)) for doc_id, score in ranked]
+
+    def highlight(self, doc_id: Hashable, tokens: Set[str], fields: Sequence[str] = ("body", "description")) -> Optional[str]:
+        """A window of words around the first match, HTML-escaped, matches wrapped like render_headline() does"""
+        for field in fields:
+            text = self._documents[doc_id]["fields"].get(field)
+            if not text:
+                continue
+            words = text.split()
+            positions = [i for i, word in enumerate(words) if any(t in tokens for t in tokenize(word))]
+            if not positions:
+                continue
+            start = max(0, positions[0] - SNIPPET_WORDS // 4)
+            window = words[start:start + SNIPPET_WORDS]
+            return " ".join(
+                f"{HIGHLIGHT_START}{html.escape(word)}{HIGHLIGHT_STOP}" if any(t in tokens for t in tokenize(word)) else html.escape(word)
+                for word in window
+            )
+        return None
+
+
+def build_index(rows: Iterable[Dict[str, Any]]) -> InvertedIndex:
+    index = InvertedIndex()
+    for row in rows:
+        index.add(
+            row["id"],
+            {"name": row["name"], "description": row["description"], "body": row["search_text"]},
+            {"category_id": row["category_id"]},
+        )
+    return index
@@ -0,0 +1,150 @@
+import json
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Tuple, Union
+
+PLACEHOLDER_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+# A compiled template is a list of placeholder entries:
+#   {"path": [key_or_index, ...], "segments": ["literal", "field", "literal", ...]}
+# Segments alternate literal text and field names (even indices are literals,
+# odd indices are field names), which is exactly what re.split returns for a
+# pattern with one capture group.
+PlaceholderIndex = List[Dict[str, Any]]
+PathKey = Union[str, int]
+
+
+def compile_template(sfdt_content: Any) -> PlaceholderIndex:
+    """Record the JSON path and literal/slot segments of every string leaf that contains {{field}} tokens"""
+    index: PlaceholderIndex = []
+    stack = [(sfdt_content, [])]
+    while stack:
+        node, path = stack.pop()
+        if isinstance(node, dict):
+            items = node.items()
+        elif isinstance(node, list):
+            items = enumerate(node)
+        else:
+            continue
+        for key, value in items:
+            if isinstance(value, str):
+                if "{{" in value:
+                    segments = PLACEHOLDER_RE.split(value)
+                    if len(segments) > 1:
+                        index.append({"path": path + [key], "segments": segments})
+            elif isinstance(value, (dict, list)):
+                stack.append((value, path + [key]))
+    return index
+
+
+def fill_segments(segments: List[str], field_data: Dict[str, str]) -> str:
+    parts = []
+    for i, segment in enumerate(segments):
+        if i % 2 == 0:
+            parts.append(segment)
+        elif segment in field_data:
+            parts.append(field_data[segment])
+        else:
+            # Unknown fields are left untouched, as before
+            parts.append("{{" + segment + "}}")
+    return "".join(parts)
+
+
+def render_template(sfdt_content: Any, index: PlaceholderIndex, field_data: Dict[str, str]) -> Any:
+    """Fill every placeholder slot, copying only the containers on the path to a touched leaf"""
+    if not index:
+        return sfdt_content
+    result = _shallow_copy(sfdt_content)
+    copied = {id(result)}
+    for entry in index:
+        path = entry["path"]
+        parent = result
+        for key in path[:-1]:
+            child = parent[key]
+            if id(child) not in copied:
+                child = _shallow_copy(child)
+                copied.add(id(child))
+                parent[key] = child
+            parent = child
+        parent[path[-1]] = fill_segments(entry["segments"], field_data)
+    return result
+
+
+def _shallow_copy(node):
+    return list(node) if isinstance(node, list) else dict(node)
+
+
+def render_batch_lines(sfdt_content: Any, index: PlaceholderIndex, records: List[Tuple[int, Any]]) -> List[Tuple[bool, str]]:
+    """Render and encode a chunk of batch records as (ok, ndjson_line) pairs; runs in a worker process for large batches"""
+    lines = []
+    for position, field_data in records:
+        try:
+            if not isinstance(field_data, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in field_data.items()):
+                raise ValueError("field_data must be an object of string values")
+            processed_sfdt = render_template(sfdt_content, index, field_data)
+            lines.append((True, json.dumps({"index": position, "processed_sfdt": processed_sfdt})))
+        except Exception as e:
+            lines.append((False, json.dumps({"index": position, "error": str(e)})))
+    return lines
+
+
+# --- Batch Worker Cache ---
+# Batch chunks run in a process pool. Each worker keeps the templates it has seen, keyed by id and
+# content hash, so a chunk carries only its records; the template crosses the process boundary
+# once per worker instead of once per chunk.
+WORKER_TEMPLATE_CACHE_SIZE = 8
+_worker_templates: "OrderedDict[Hashable, Tuple[Any, PlaceholderIndex]]" = OrderedDict()
+
+
+class TemplateNotLoaded(LookupError):
+    """The worker doesn't hold this template yet; resend the chunk with render_loaded_batch_lines"""
+
+
+def render_cached_batch_lines(key: Hashable, records: List[Tuple[int, Any]]) -> List[Tuple[bool, str]]:
+    template = _worker_templates.get(key)
+    if template is None:
+        raise TemplateNotLoaded(key)
+    _worker_templates.move_to_end(key)
+    return render_batch_lines(*template, records)
+
+
+def render_loaded_batch_lines(key: Hashable, sfdt_content: Any, index: PlaceholderIndex, records: List[Tuple[int, Any]]) -> List[Tuple[bool, str]]:
+    _worker_templates[key] = (sfdt_content, index)
+    _worker_templates.move_to_end(key)
+    while len(_worker_templates) > WORKER_TEMPLATE_CACHE_SIZE:
+        _worker_templates.popitem(last=False)
+    return render_batch_lines(sfdt_content, index, records)
+
+
+# Syncfusion writes either the verbose SFDT keys or their optimized short forms
+SECTION_KEYS = ("sections", "sec")
+INLINE_KEYS = ("inlines", "i")
+TEXT_KEYS = ("text", "tlp")
+
+
+def extract_text(sfdt_content: Any) -> str:
+    """Plain document text: every inline run under the sections, one line per paragraph.
+
+    Placeholders keep their field name without the braces so they are searchable too.
+    """
+    if not isinstance(sfdt_content, dict):
+        return ""
+    paragraphs = []
+    stack = [sfdt_content[key] for key in SECTION_KEYS if key in sfdt_content]
+    stack.reverse()
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        inlines = next((node[key] for key in INLINE_KEYS if isinstance(node.get(key), list)), None)
+        if inlines is not None:
+            runs = [next((inline[key] for key in TEXT_KEYS if isinstance(inline.get(key), str)), "") for inline in inlines if isinstance(inline, dict)]
+            paragraph = PLACEHOLDER_RE.sub(r"\1", "".join(runs)).strip()
+            if paragraph:
+                paragraphs.append(paragraph)
+        # Tables, headers and footers nest further blocks anywhere below a paragraph or section
+        stack.extend(reversed([value for key, value in node.items() if key not in INLINE_KEYS and isinstance(value, (dict, list))]))
+    return "\n".join(paragraphs)
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterable, AsyncIterator, List, Optional
+
+CHAT_STREAM_FLUSH_CHARS = int(os.getenv("CHAT_STREAM_FLUSH_CHARS", "64"))
+CHAT_STREAM_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_STREAM_FLUSH_INTERVAL_MS", "50"))
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Stop nginx from buffering the event stream
+}
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One text/event-stream frame; JSON data never contains raw newlines, so a single data line suffices"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class StreamRelay:
+    """
+    Relays text deltas as SSE `delta` frames, coalescing them until `flush_chars` characters
+    are buffered or `flush_interval` seconds have passed since the last flush. The first delta
+    is sent immediately so time to first byte is unaffected. Deltas are kept in a list and
+    joined once in `text`.
+    """
+
+    def __init__(self, flush_chars: int = CHAT_STREAM_FLUSH_CHARS, flush_interval: float = CHAT_STREAM_FLUSH_INTERVAL_MS / 1000):
+        self.flush_chars = flush_chars
+        self.flush_interval = flush_interval
+        self.parts: List[str] = []
+        self.frames = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    async def relay(self, deltas: AsyncIterable[str]) -> AsyncIterator[bytes]:
+        iterator = deltas.__aiter__()
+        pending_start = len(self.parts)
+        pending_chars = 0
+        last_flush: Optional[float] = None
+        next_delta: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if next_delta is None:
+                    next_delta = asyncio.ensure_future(iterator.__anext__())
+                timeout = None
+                if pending_chars and last_flush is not None:
+                    timeout = max(0.0, last_flush + self.flush_interval - time.monotonic())
+                done, _ = await asyncio.wait({next_delta}, timeout=timeout)
+
+                if done:
+                    try:
+                        delta = next_delta.result()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        next_delta = None
+                    self.parts.append(delta)
+                    pending_chars += len(delta)
+                    if last_flush is not None and pending_chars < self.flush_chars and time.monotonic() - last_flush < self.flush_interval:
+                        continue
+
+                # Size or time threshold reached (or this is the first delta)
+                if pending_chars:
+                    yield sse_event("delta", {"text": "".join(self.parts[pending_start:])})
+                    self.frames += 1
+                    pending_start = len(self.parts)
+                    pending_chars = 0
+                    last_flush = time.monotonic()
+        finally:
+            if next_delta is not None:
+                next_delta.cancel()
+
+        if pending_chars:
+            yield sse_event("delta", {"text": "".join(self.parts[pending_start:])})
+            self.frames += 1
@@ -0,0 +1,138 @@
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+UPLOAD_MAX_DEPTH = int(os.getenv("UPLOAD_MAX_DEPTH", "64"))
+FIELDS_SCHEMA_MAX_FIELDS = int(os.getenv("FIELDS_SCHEMA_MAX_FIELDS", "1000"))
+FIELD_NAME_MAX_CHARS = int(os.getenv("FIELD_NAME_MAX_CHARS", "200"))
+
+# A check takes a value and how many more levels of nesting it may open, and raises ValidationError
+Check = Callable[[Any, int], None]
+
+
+class ValidationError(ValueError):
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+        self.path: List[Union[str, int]] = []  # Filled in while the error unwinds, so valid documents never build paths
+
+    def __str__(self) -> str:
+        path = "".join(f"[{key}]" if isinstance(key, int) else f".{key}" for key in self.path)
+        return f"${path}: {self.message}"
+
+
+def _enter(remaining: int) -> None:
+    if remaining <= 0:
+        raise ValidationError("nested too deeply")
+
+
+# --- Combinators ---
+# Validators are composed from these once, when the module is imported, and then only called
+
+def anything(value: Any, remaining: int) -> None:
+    """Any JSON value; containers are walked iteratively, only to enforce the depth limit"""
+    stack = [(value, remaining)]
+    while stack:
+        node, left = stack.pop()
+        if not isinstance(node, (dict, list)):
+            continue
+        _enter(left)
+        stack.extend((child, left - 1) for child in (node.values() if isinstance(node, dict) else node) if isinstance(child, (dict, list)))
+
+
+def string(max_length: Optional[int] = None, pattern: Optional[str] = None) -> Check:
+    compiled = re.compile(pattern) if pattern else None
+
+    def check(value, remaining):
+        if not isinstance(value, str):
+            raise ValidationError("expected a string")
+        if max_length is not None and len(value) > max_length:
+            raise ValidationError(f"longer than {max_length} characters")
+        if compiled is not None and not compiled.fullmatch(value):
+            raise ValidationError(f"does not match {pattern}")
+    return check
+
+
+def array(items: Check) -> Check:
+    def check(value, remaining):
+        if not isinstance(value, list):
+            raise ValidationError("expected an array")
+        _enter(remaining)
+        for position, item in enumerate(value):
+            try:
+                items(item, remaining - 1)
+            except ValidationError as e:
+                e.path.insert(0, position)
+                raise
+    return check
+
+
+def obj(fields: Optional[Dict[str, Check]] = None, required: Sequence[str] = (), other: Check = anything,
+        key: Optional[Check] = None, max_items: Optional[int] = None) -> Check:
+    """An object whose `fields` are checked as given and every other member with `other`"""
+    fields = fields or {}
+    # Scalars can't break the depth limit, so unchecked members only cost a lookup
+    skip_scalars = other is anything
+
+    def check(value, remaining):
+        if not isinstance(value, dict):
+            raise ValidationError("expected an object")
+        _enter(remaining)
+        if max_items is not None and len(value) > max_items:
+            raise ValidationError(f"more than {max_items} members")
+        for name in required:
+            if name not in value:
+                raise ValidationError(f"missing '{name}'")
+        for name, item in value.items():
+            try:
+                if key is not None:
+                    key(name, remaining)
+                member_check = fields.get(name)
+                if member_check is None:
+                    if skip_scalars and not isinstance(item, (dict, list)):
+                        continue
+                    member_check = other
+                member_check(item, remaining - 1)
+            except ValidationError as e:
+                e.path.insert(0, name)
+                raise
+    return check
+
+
+class Ref:
+    """Forward reference for recursive structures; point `target` at the check once it exists"""
+
+    def __init__(self):
+        self.target: Optional[Check] = None
+
+    def __call__(self, value, remaining):
+        self.target(value, remaining)
+
+
+# --- Document Validators ---
+
+def compile_sfdt_validator(max_depth: int = UPLOAD_MAX_DEPTH) -> Callable[[Any], None]:
+    """
+    Structure of a Syncfusion SFDT document: sections of blocks; paragraphs hold inlines,
+    tables hold rows of cells that hold blocks again. Formatting and other members are not
+    interpreted, only depth-limited.
+    """
+    block, inline = Ref(), Ref()
+    blocks = array(block)
+    inline.target = obj({"text": string(), "inlines": array(inline)})
+    row = obj({"cells": array(obj({"blocks": blocks}))})
+    block.target = obj({"inlines": array(inline), "rows": array(row), "blocks": blocks})
+    section = obj({"blocks": blocks, "headersFooters": obj(other=obj({"blocks": blocks}))})
+    document = obj({"sections": array(section)}, required=("sections",))
+    return lambda value: document(value, max_depth)
+
+
+def compile_fields_schema_validator(max_depth: int = UPLOAD_MAX_DEPTH, max_fields: int = FIELDS_SCHEMA_MAX_FIELDS) -> Callable[[Any], None]:
+    """An object keyed by field name; names can't contain braces, since they appear as {{name}} in SFDT"""
+    field_name = string(max_length=FIELD_NAME_MAX_CHARS, pattern=r"[^{}]+")
+    schema = obj(key=field_name, max_items=max_fields)
+    return lambda value: schema(value, max_depth)
+
+
+validate_sfdt = compile_sfdt_validator()
+validate_fields_schema = compile_fields_schema_validator()
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+WORKLOADS = ("chat", "history", "template_read", "template_process", "category_tree", "login_burst")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    def __init__(self, pid: int, interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, rss_mb(self.pid) or 0.0)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_mb(self.pid) or 0.0
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def spawn(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=REPO_ROOT, env={**os.environ, **env})
+
+
+def wait_until_healthy(url: str, process: subprocess.Popen, timeout: float = 60.0) -> float:
+    """Seconds from now until `url` answers 200"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming healthy")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def measure_import(env: Dict[str, str], runs: int = 3) -> float:
+    """Best-of-N wall time to import the app in a fresh interpreter"""
+    code = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+    timings = [
+        float(subprocess.check_output([sys.executable, "-c", code], cwd=REPO_ROOT, env={**os.environ, **env}, text=True).split()[-1])
+        for _ in range(runs)
+    ]
+    return min(timings)
+
+
+def prepare_schema(database_url: str, mode: str) -> None:
+    if mode == "alembic":
+        subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=REPO_ROOT, env={**os.environ, "DATABASE_URL": database_url}, check=True)
+    elif mode == "create_all":
+        from sqlalchemy import create_engine
+        from app.models import Base
+        engine = create_engine(database_url)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+
+async def drive(args, seeded, app_url: str, app_pid: int) -> Dict:
+    from . import workloads as w
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    headers = {"Accept-Encoding": args.accept_encoding} if args.accept_encoding else None
+    async with httpx.AsyncClient(base_url=app_url, timeout=120.0, limits=limits, headers=headers) as client:
+        tokens = {}
+        for username in seeded.usernames[:args.active_users]:
+            response = await w.login(client, username)
+            response.raise_for_status()
+            tokens[username] = response.json()["access_token"]
+
+        operations = {
+            "chat": w.chat_turn(seeded, tokens),
+            "history": w.history_listing(tokens),
+            "template_read": w.template_read(seeded, tokens),
+            "template_process": w.template_process(seeded, tokens),
+            "category_tree": w.category_tree(),
+            "login_burst": w.login_burst(seeded),
+        }
+        results = {}
+        for name in args.workloads:
+            # A short unrecorded warm-up fills connection pools and caches
+            await w.run_workload(name, client, operations[name], args.concurrency, max(args.concurrency, args.requests // 10))
+            with RssSampler(app_pid) as sampler:
+                result = await w.run_workload(name, client, operations[name], args.concurrency, args.requests, seed=args.seed)
+            summary = result.summary()
+            summary["rss_peak_mb"] = round(sampler.peak, 1)
+            results[name] = summary
+            print(f"{name}: {summary['throughput_rps']} req/s, p50 {summary['latency_ms'].get('p50')} ms, p99 {summary['latency_ms'].get('p99')} ms", file=sys.stderr)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Load and latency benchmark for the API")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL") or os.getenv("DATABASE_URL"), help="Postgres database to seed and run against")
+    parser.add_argument("--schema", choices=("alembic", "create_all", "none"), default="alembic", help="How to prepare the schema before seeding")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="Recorded requests per workload")
+    parser.add_argument("--active-users", type=int, default=20, help="Users that log in and drive authenticated workloads")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--chats-per-user", type=int, default=20)
+    parser.add_argument("--messages-per-chat", type=int, default=30)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--templates-per-category", type=int, default=10)
+    parser.add_argument("--template-sections", type=int, default=40)
+    parser.add_argument("--template-blocks", type=int, default=50)
+    parser.add_argument("--llm-tokens", type=int, default=200, help="Tokens per fake completion")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--llm-first-token-latency", type=float, default=0.3)
+    parser.add_argument("--accept-encoding", help="Accept-Encoding sent with every request, e.g. identity to measure uncompressed responses")
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+
+    # The seeding helpers import app.models, which reads these at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+    from .seed import SeedConfig, seed
+
+    prepare_schema(args.database_url, args.schema)
+    prefix = f"bench_{uuid.uuid4().hex[:8]}"
+    seed_config = SeedConfig(
+        users=args.users,
+        chats_per_user=args.chats_per_user,
+        messages_per_chat=args.messages_per_chat,
+        categories=args.categories,
+        templates_per_category=args.templates_per_category,
+        template_sections=args.template_sections,
+        template_blocks=args.template_blocks,
+    )
+    seed_started = time.perf_counter()
+    seeded = seed(args.database_url, seed_config, prefix, args.seed)
+    seed_seconds = time.perf_counter() - seed_started
+
+    llm_port, app_port = free_port(), free_port()
+    llm = spawn(["-m", "bench.fake_openai", "--port", str(llm_port), "--tokens", str(args.llm_tokens),
+                 "--tokens-per-second", str(args.llm_tokens_per_second), "--first-token-latency", str(args.llm_first_token_latency)], {})
+    app = None
+    try:
+        wait_until_healthy(f"http://127.0.0.1:{llm_port}/health", llm)
+        app_env = {
+            "DATABASE_URL": args.database_url,
+            "OPENAI_API_KEY": "bench",
+            "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{llm_port}",
+            "AZURE_OPENAI_MODEL": "bench-model",
+            "AZURE_OPENAI_DEPLOYMENT": "bench-model",
+            "AZURE_OPENAI_API_VERSION": "2024-10-21",
+            # Measure the service, not the limiter; the login burst still reports any 429/503s
+            "CHAT_RATE_LIMIT_MAX_REQUESTS": os.getenv("CHAT_RATE_LIMIT_MAX_REQUESTS", "1000000"),
+            "LOGIN_RATE_LIMIT_MAX_REQUESTS": os.getenv("LOGIN_RATE_LIMIT_MAX_REQUESTS", "1000000"),
+        }
+        import_seconds = measure_import(app_env)
+        app_started = time.perf_counter()
+        app = spawn(["-m", "uvicorn", "app.main:app", "--port", str(app_port), "--workers", str(args.app_workers), "--log-level", "warning"], app_env)
+        startup_seconds = time.perf_counter() - app_started + wait_until_healthy(f"http://127.0.0.1:{app_port}/ready", app)
+        rss_start = rss_mb(app.pid)
+
+        results = asyncio.run(drive(args, seeded, f"http://127.0.0.1:{app_port}", app.pid))
+
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "prefix": prefix,
+                "config": {k: v for k, v in vars(args).items() if k not in ("database_url", "output")},
+            },
+            "seed_seconds": round(seed_seconds, 2),
+            "import_seconds": round(import_seconds, 3),
+            "startup_seconds": round(startup_seconds, 3),
+            "rss_mb": {"start": rss_start, "end": rss_mb(app.pid)},
+            "workloads": results,
+        }
+    finally:
+        for process in (app, llm):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Offline micro-benchmark for the template read path: the decoded path (driver JSON decode,
+response_model validation, stdlib or orjson encoding) against splicing the JSONB text into
+the body, and each available compression coding, on a synthetic SFDT template. Needs no
+database or server.
+
+    python -m bench.encoding --template-sections 40 --template-blocks 50 --runs 20
+"""
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+import uuid
+from typing import Callable, Dict
+
+from .seed import build_sfdt
+
+
+def best_ms(work: Callable[[], object], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        work()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) * 1000, 3)
+
+
+def run(sections: int, blocks: int, fields: int, runs: int, seed: int) -> Dict:
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from app import compression, schemas
+    from app.rawjson import dumps_object
+
+    content = build_sfdt(sections, blocks, fields, random.Random(seed))
+    category_id = uuid.uuid4()
+    template = {
+        "id": uuid.uuid4(),
+        "name": "bench template",
+        "description": "Synthetic benchmark template",
+        "category_id": category_id,
+        "created_at": datetime.datetime.utcnow(),
+        "fields_schema": {f"field_{i}": "string" for i in range(fields)},
+        "template_content": content,
+        "category": {"id": category_id, "name": "bench category"},
+    }
+
+    # What FastAPI does with a response_model before handing the result to the response class
+    def validate():
+        return schemas.DocumentTemplateRead.model_validate(template).model_dump(mode="json")
+
+    # The JSONB columns as Postgres returns them ::text
+    fields_schema_text = json.dumps(template["fields_schema"])
+    template_content_text = json.dumps(content)
+
+    def decode():
+        return json.loads(fields_schema_text), json.loads(template_content_text)
+
+    def splice():
+        return dumps_object({
+            **{key: template[key] for key in ("name", "description", "category_id", "id", "created_at")},
+            "fields_schema": fields_schema_text,
+            "template_content": template_content_text,
+            "category": template["category"],
+        }, raw=("fields_schema", "template_content"))
+
+    payload = validate()
+    body = ORJSONResponse(payload).body
+    report = {
+        "body_bytes": len(body),
+        "decode_ms": best_ms(decode, runs),
+        "validate_ms": best_ms(validate, runs),
+        "raw_splice_ms": best_ms(splice, runs),
+        "encode_ms": {
+            "json": best_ms(lambda: JSONResponse(payload), runs),
+            "orjson": best_ms(lambda: ORJSONResponse(payload), runs),
+        },
+        "compression": {},
+    }
+    for encoding in compression.ENCODERS:
+        compressed = compression.compress(encoding, body)
+        report["compression"][encoding] = {
+            "bytes": len(compressed),
+            "ratio": round(len(body) / len(compressed), 1),
+            "ms": best_ms(lambda: compression.compress(encoding, body), runs),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.encoding", description="Template serialization and compression micro-benchmark")
+    parser.add_argument("--template-sections", type=int, default=40)
+    parser.add_argument("--template-blocks", type=int, default=50)
+    parser.add_argument("--template-fields", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=20, help="Best-of-N timing runs")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    report = run(args.template_sections, args.template_blocks, args.template_fields, args.runs, args.seed)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "Under the Companies and Allied Matters Act 2020 a business name must be registered with "
+    "the Corporate Affairs Commission within twenty eight days of commencing business and the "
+    "proprietor should keep the certificate displayed at the principal place of business"
+).split()
+
+
+def create_app(tokens: int = 200, tokens_per_second: float = 80.0, first_token_latency: float = 0.3) -> FastAPI:
+    """An OpenAI-compatible chat completions endpoint with a controllable token rate and latency"""
+    app = FastAPI()
+    app.state.requests = 0
+
+    def completion_text(count: int) -> list:
+        return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_latency)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": deployment,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(completion_text(12)).strip()}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 12, "total_tokens": 12},
+            })
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": deployment,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            await asyncio.sleep(first_token_latency)
+            yield chunk({"role": "assistant", "content": ""})
+            started = time.perf_counter()
+            for i, word in enumerate(completion_text(tokens)):
+                # Pace against the wall clock so slow consumers don't stretch the token rate
+                delay = started + i / tokens_per_second - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield chunk({"content": word})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Azure OpenAI streaming server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8910)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    args = parser.parse_args()
+    app = create_app(args.tokens, args.tokens_per_second, args.first_token_latency)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import datetime
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sqlalchemy import create_engine, insert
+
+BENCH_PASSWORD = "bench-password"
+
+
+@dataclass
+class SeedConfig:
+    users: int = 50
+    chats_per_user: int = 20
+    messages_per_chat: int = 30
+    categories: int = 10
+    templates_per_category: int = 10
+    template_sections: int = 40
+    template_blocks: int = 50
+    template_fields: int = 30
+
+
+@dataclass
+class Seeded:
+    prefix: str
+    usernames: List[str] = field(default_factory=list)
+    chat_ids: Dict[str, List[str]] = field(default_factory=dict)  # username -> chat ids
+    template_ids: List[str] = field(default_factory=list)
+    template_fields: int = 0
+
+
+def build_sfdt(sections: int, blocks: int, fields: int, rng: random.Random) -> dict:
+    """A Syncfusion-style document: sections of paragraph blocks, some inlines carrying {{field}} placeholders"""
+    doc = {"sections": []}
+    for s in range(sections):
+        section_blocks = []
+        for b in range(blocks):
+            inlines = [{"text": f"Clause {s}.{b}. The parties agree that ", "characterFormat": {"fontSize": 11}}]
+            if rng.random() < 0.3:
+                inlines.append({"text": "{{field_%d}} shall be bound by {{field_%d}}." % (rng.randrange(fields), rng.randrange(fields))})
+            inlines.append({"text": "this agreement is governed by the laws of the Federal Republic of Nigeria."})
+            section_blocks.append({"paragraphFormat": {"styleName": "Normal"}, "inlines": inlines})
+        doc["sections"].append({"sectionFormat": {"pageWidth": 612, "pageHeight": 792}, "blocks": section_blocks})
+    return doc
+
+
+def seed(database_url: str, config: SeedConfig, prefix: str, seed_value: int = 1234) -> Seeded:
+    """Insert synthetic data under `prefix` so runs never collide with each other or with real rows"""
+    from app import etag, models, sfdt
+    from app.auth import pwd_context
+
+    rng = random.Random(seed_value)
+    engine = create_engine(database_url)
+    seeded = Seeded(prefix=prefix, template_fields=config.template_fields)
+    # Every bench user shares one hash; hashing thousands of passwords would dominate seeding
+    hashed_password = pwd_context.hash(BENCH_PASSWORD)
+    now = datetime.datetime.utcnow()
+
+    users, chats, messages = [], [], []
+    for u in range(config.users):
+        user_id = uuid.uuid4()
+        username = f"{prefix}_user_{u}"
+        users.append({"id": user_id, "username": username, "email": f"{username}@bench.example", "hashed_password": hashed_password})
+        seeded.usernames.append(username)
+        seeded.chat_ids[username] = []
+        for c in range(config.chats_per_user):
+            chat_id = uuid.uuid4()
+            chats.append({"id": chat_id, "user_id": user_id, "title": f"Bench chat {c}", "created_at": now - datetime.timedelta(minutes=c)})
+            seeded.chat_ids[username].append(str(chat_id))
+            for seq in range(config.messages_per_chat):
+                role = "user" if seq % 2 == 0 else "assistant"
+                content = " ".join(rng.choice(("contract", "tenancy", "company", "court", "appeal", "lease", "deed", "notice")) for _ in range(40 if role == "user" else 200))
+                messages.append({"chat_id": chat_id, "seq": seq, "user_id": user_id, "role": role, "content": content, "token_count": None})
+
+    categories, templates = [], []
+    for c in range(config.categories):
+        category_id = uuid.uuid4()
+        categories.append({"id": category_id, "name": f"{prefix} category {c}"})
+        for t in range(config.templates_per_category):
+            template_id = uuid.uuid4()
+            content = build_sfdt(config.template_sections, config.template_blocks, config.template_fields, rng)
+            template = {
+                "id": template_id,
+                "name": f"{prefix} template {c}.{t}",
+                "description": "Synthetic benchmark template",
+                "fields_schema": {f"field_{i}": "string" for i in range(config.template_fields)},
+                "template_content": content,
+                "placeholder_index": sfdt.compile_template(content),
+                "category_id": category_id,
+            }
+            template["content_hash"] = etag.template_content_hash(
+                template["name"], template["description"], category_id, template["fields_schema"], content
+            )
+            templates.append(template)
+            seeded.template_ids.append(str(template_id))
+
+    with engine.begin() as conn:
+        for table, rows in (
+            (models.User, users),
+            (models.ChatHistory, chats),
+            (models.ChatMessage, messages),
+            (models.TemplateCategory, categories),
+            (models.DocumentTemplate, templates),
+        ):
+            for start in range(0, len(rows), 1000):
+                conn.execute(insert(table), rows[start:start + 1000])
+    engine.dispose()
+    return seeded
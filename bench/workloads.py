@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .seed import BENCH_PASSWORD, Seeded
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int
+    ttfb: Optional[float] = None
+    wire_bytes: Optional[int] = None
+
+
+@dataclass
+class WorkloadResult:
+    name: str
+    concurrency: int
+    wall_seconds: float
+    samples: List[Sample] = field(default_factory=list)
+
+    def summary(self) -> Dict:
+        latencies = sorted(s.latency for s in self.samples)
+        ok = [s for s in self.samples if 200 <= s.status < 400]
+        result = {
+            "requests": len(self.samples),
+            "ok": len(ok),
+            "concurrency": self.concurrency,
+            "status_counts": dict(sorted(Counter(str(s.status) for s in self.samples).items())),
+            "throughput_rps": round(len(ok) / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "latency_ms": percentiles(latencies),
+        }
+        ttfbs = sorted(s.ttfb for s in self.samples if s.ttfb is not None)
+        if ttfbs:
+            result["ttfb_ms"] = percentiles(ttfbs)
+        sizes = [s.wire_bytes for s in ok if s.wire_bytes is not None]
+        if sizes:
+            result["wire_bytes_mean"] = round(sum(sizes) / len(sizes))
+        return result
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank percentiles in milliseconds over sorted values"""
+    if not values:
+        return {}
+
+    def rank(p: float) -> float:
+        return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))] * 1000
+
+    return {
+        "p50": round(rank(50), 2),
+        "p95": round(rank(95), 2),
+        "p99": round(rank(99), 2),
+        "mean": round(sum(values) / len(values) * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+Operation = Callable[[httpx.AsyncClient, random.Random], Awaitable[Sample]]
+
+
+async def run_workload(name: str, client: httpx.AsyncClient, operation: Operation, concurrency: int, requests: int, seed: int = 0) -> WorkloadResult:
+    counter = itertools.count()
+    result = WorkloadResult(name=name, concurrency=concurrency, wall_seconds=0.0)
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        while next(counter) < requests:
+            started = time.perf_counter()
+            try:
+                sample = await operation(client, rng)
+            except httpx.HTTPError:
+                sample = Sample(time.perf_counter() - started, 599)
+            result.samples.append(sample)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    result.wall_seconds = time.perf_counter() - started
+    return result
+
+
+# --- Operations ---
+
+def auth_header(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def login(client: httpx.AsyncClient, username: str) -> httpx.Response:
+    return await client.post("/auth/token", data={"username": username, "password": BENCH_PASSWORD})
+
+
+def chat_turn(seeded: Seeded, tokens: Dict[str, str], continue_ratio: float = 0.5) -> Operation:
+    """A full streamed answer; half the turns continue a seeded chat, half start a new one"""
+    usernames = list(tokens)
+
+    async def operation(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+        username = rng.choice(usernames)
+        body = {"message": "How do I register a business name in Nigeria?"}
+        if rng.random() < continue_ratio and seeded.chat_ids[username]:
+            body["chat_id"] = rng.choice(seeded.chat_ids[username])
+        started = time.perf_counter()
+        ttfb = None
+        async with client.stream("POST", "/chat/", json=body, headers=auth_header(tokens[username])) as response:
+            async for line in response.aiter_lines():
+                if ttfb is None and line.startswith("event: delta"):
+                    ttfb = time.perf_counter() - started
+        return Sample(time.perf_counter() - started, response.status_code, ttfb)
+
+    return operation
+
+
+def history_listing(tokens: Dict[str, str]) -> Operation:
+    usernames = list(tokens)
+
+    async def operation(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+        started = time.perf_counter()
+        response = await client.get("/chat/history/all", params={"view": "summary", "limit": 20}, headers=auth_header(tokens[rng.choice(usernames)]))
+        return Sample(time.perf_counter() - started, response.status_code)
+
+    return operation
+
+
+def template_process(seeded: Seeded, tokens: Dict[str, str]) -> Operation:
+    token = next(iter(tokens.values()))
+    field_data = {f"field_{i}": f"Value {i}" for i in range(seeded.template_fields)}
+
+    async def operation(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+        started = time.perf_counter()
+        response = await client.post(f"/template/{rng.choice(seeded.template_ids)}/process", json=field_data, headers=auth_header(token))
+        await response.aread()
+        return Sample(time.perf_counter() - started, response.status_code)
+
+    return operation
+
+
+def template_read(seeded: Seeded, tokens: Dict[str, str]) -> Operation:
+    """Full template GETs; the client's Accept-Encoding decides whether they come back compressed"""
+    token = next(iter(tokens.values()))
+
+    async def operation(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+        started = time.perf_counter()
+        response = await client.get(f"/template/get/{rng.choice(seeded.template_ids)}", headers=auth_header(token))
+        await response.aread()
+        return Sample(time.perf_counter() - started, response.status_code, wire_bytes=response.num_bytes_downloaded)
+
+    return operation
+
+
+def category_tree() -> Operation:
+    async def operation(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+        started = time.perf_counter()
+        response = await client.get("/category/tree")
+        return Sample(time.perf_counter() - started, response.status_code)
+
+    return operation
+
+
+def login_burst(seeded: Seeded) -> Operation:
+    async def operation(client: httpx.AsyncClient, rng: random.Random) -> Sample:
+        started = time.perf_counter()
+        response = await login(client, rng.choice(seeded.usernames))
+        return Sample(time.perf_counter() - started, response.status_code)
+
+    return operation
@@ -0,0 +1,90 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import invalidate_catalogue
+from app.routers.category import get_cached_categories, get_cached_category_tree
+
+
+# The Postgres-only column types, as SQLite stand-ins
+@compiles(JSONB, "sqlite")
+def _jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(TSVECTOR, "sqlite")
+def _tsvector_sqlite(type_, compiler, **kw):
+    return "TEXT"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def add_search_functions(dbapi_connection, connection_record):
+        # Referenced by the search_vector generated column
+        dbapi_connection.create_function("to_tsvector", 2, lambda config, text: text, deterministic=True)
+        dbapi_connection.create_function("setweight", 2, lambda vector, weight: vector, deterministic=True)
+
+    models.Base.metadata.create_all(engine, tables=[models.TemplateCategory.__table__, models.DocumentTemplate.__table__])
+    yield engine
+    engine.dispose()
+
+
+def seed(engine, categories: int, templates_per_category: int = 3) -> None:
+    with Session(engine) as db:
+        for c in range(categories):
+            category = models.TemplateCategory(id=uuid.uuid4(), name=f"category {c}")
+            db.add(category)
+            for t in range(templates_per_category):
+                db.add(models.DocumentTemplate(
+                    id=uuid.uuid4(),
+                    name=f"template {c}-{t}",
+                    description="",
+                    category_id=category.id,
+                    fields_schema={"name": "string"},
+                    template_content={"sections": []},
+                ))
+        db.commit()
+
+
+def count_queries(engine, load) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    invalidate_catalogue()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with Session(engine) as db:
+            result = load(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+        invalidate_catalogue()
+    assert result
+    return len(statements)
+
+
+@pytest.mark.parametrize("load", [get_cached_categories, get_cached_category_tree])
+@pytest.mark.parametrize("categories", [1, 25])
+def test_catalogue_loads_in_two_queries(engine, load, categories):
+    seed(engine, categories)
+    assert count_queries(engine, load) == 2
+
+
+@pytest.mark.parametrize("load", [get_cached_categories, get_cached_category_tree])
+def test_catalogue_loads_templates_of_every_category(engine, load):
+    seed(engine, 4, templates_per_category=2)
+    invalidate_catalogue()
+    with Session(engine) as db:
+        categories = load(db)
+    invalidate_catalogue()
+    assert len(categories) == 4
+    assert all(len(category["templates"]) == 2 for category in categories)
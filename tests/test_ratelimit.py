@@ -0,0 +1,93 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app import ratelimit
+from app.ratelimit import InMemoryRateLimitBackend, RedisRateLimitBackend
+
+LIMIT = 3
+WINDOW = 60.0
+START = 100 * WINDOW  # On a window boundary
+
+
+class FakeClock:
+    """Stands in for the time module; the memory backend reads monotonic(), the Redis one time()"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(START)
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return InMemoryRateLimitBackend()
+    return RedisRateLimitBackend(fakeredis.FakeAsyncRedis())
+
+
+def hits(backend, count: int, key: str = "chat:user:1"):
+    async def run():
+        return [await backend.hit(key, LIMIT, WINDOW) for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_allows_up_to_the_limit(backend, clock):
+    results = hits(backend, LIMIT)
+    assert [r.allowed for r in results] == [True] * LIMIT
+    assert [r.remaining for r in results] == [2, 1, 0]
+    assert results[-1].headers()["X-RateLimit-Limit"] == str(LIMIT)
+
+
+def test_rejects_with_retry_after(backend, clock):
+    hits(backend, LIMIT)
+    clock.now += 15
+    rejected = hits(backend, 1)[0]
+    assert not rejected.allowed
+    assert rejected.remaining == 0
+    # The window rolls over in 45s, then the previous 3 must decay to 2 to leave room: 20s more
+    assert rejected.headers()["Retry-After"] == "65"
+
+
+def test_retry_after_is_when_the_request_would_pass(backend, clock):
+    hits(backend, LIMIT)
+    clock.now = START + WINDOW * 1.5
+    hits(backend, 1)
+    rejected = hits(backend, 1)[0]
+    assert not rejected.allowed
+    clock.now += rejected.retry_after - 1
+    assert not hits(backend, 1)[0].allowed
+    clock.now += 1
+    assert hits(backend, 1)[0].allowed
+
+
+def test_rejections_do_not_consume_budget(backend, clock):
+    hits(backend, LIMIT)
+    assert not any(r.allowed for r in hits(backend, 5))
+    # Three quarters into the next window the previous 3 weigh 0.75, leaving room for 2 more;
+    # had the 5 rejections been counted, the previous 8 would weigh 2 and leave room for 1
+    clock.now = START + WINDOW * 1.75
+    assert [r.allowed for r in hits(backend, 3)] == [True, True, False]
+
+
+def test_window_resets(backend, clock):
+    hits(backend, LIMIT + 2)
+    clock.now = START + WINDOW * 2
+    assert [r.allowed for r in hits(backend, LIMIT + 1)] == [True] * LIMIT + [False]
+
+
+def test_keys_are_independent(backend, clock):
+    hits(backend, LIMIT + 1, key="chat:user:1")
+    assert all(r.allowed for r in hits(backend, LIMIT, key="chat:user:2"))
@@ -0,0 +1,129 @@
+import pytest
+
+from app.search import InvertedIndex, build_index, render_headline, to_tsquery
+from app.sfdt import extract_text
+
+
+def template(id, name, description="", body="", category_id="contracts"):
+    return {"id": id, "name": name, "description": description, "search_text": body, "category_id": category_id}
+
+
+@pytest.fixture
+def index():
+    return build_index([
+        template("lease-name", "Residential Lease", body="Agreement between landlord and tenant."),
+        template("lease-body", "Rental Agreement", body="The tenant signs this lease for one year."),
+        template("nda", "Non-Disclosure Agreement", body="Confidential information stays confidential.", category_id="corporate"),
+        template("loan", "Loan Agreement", description="Leasehold security for a loan."),
+    ])
+
+
+def ids(hits):
+    return [doc_id for doc_id, _, _ in hits]
+
+
+# --- to_tsquery ---
+
+def test_to_tsquery_ands_terms_with_prefix_matching():
+    assert to_tsquery("Lease  agreement!") == "'lease':* & 'agreement':*"
+    assert to_tsquery("lease", prefix=False) == "'lease'"
+    assert to_tsquery("  !? ") is None
+
+
+# --- InvertedIndex ---
+
+def test_name_hits_rank_above_body_hits(index):
+    assert ids(index.search("lease", prefix=False)) == ["lease-name", "lease-body"]
+
+
+def test_prefix_matching(index):
+    assert ids(index.search("leas", prefix=False)) == []
+    assert set(ids(index.search("leas"))) == {"lease-name", "lease-body", "loan"}
+
+
+def test_all_terms_must_match(index):
+    assert ids(index.search("tenant lease")) == ["lease-name", "lease-body"]
+    assert ids(index.search("tenant confidential")) == []
+
+
+def test_category_filter(index):
+    assert ids(index.search("agreement", filters={"category_id": "corporate"})) == ["nda"]
+    assert "nda" not in ids(index.search("agreement", filters={"category_id": "contracts"}))
+
+
+def test_limit_and_offset(index):
+    everything = ids(index.search("agreement"))
+    assert len(everything) == 4
+    assert ids(index.search("agreement", limit=2, offset=1)) == everything[1:3]
+
+
+def test_removed_and_replaced_documents():
+    index = InvertedIndex()
+    index.add(1, {"name": "Lease"})
+    index.add(1, {"name": "Loan"})
+    assert ids(index.search("lease")) == []
+    assert ids(index.search("loan")) == [1]
+    index.remove(1)
+    assert len(index) == 0
+    assert ids(index.search("loan")) == []
+
+
+def test_highlight_marks_matches_and_escapes_text():
+    index = InvertedIndex()
+    index.add(1, {"name": "Lease", "body": "<b>Tenant</b> pays & signs the lease"})
+    [(_, _, highlight)] = index.search("lease")
+    assert highlight == "&lt;b&gt;Tenant&lt;/b&gt; pays &amp; signs the <mark>lease</mark>"
+
+
+def test_highlight_falls_back_to_description(index):
+    [(_, _, highlight)] = index.search("leasehold")
+    assert highlight == "<mark>Leasehold</mark> security for a loan."
+
+
+def test_render_headline_escapes_around_markers():
+    assert render_headline("a <lease> & b") == "a <mark>&lt;lease&gt;</mark> &amp; b"
+    assert render_headline(None) is None
+
+
+# --- sfdt.extract_text ---
+
+def paragraph(*runs):
+    return {"inlines": [{"text": run} for run in runs]}
+
+
+def test_extract_text_walks_sections_blocks_and_inlines():
+    document = {"sections": [
+        {"blocks": [paragraph("This lease ", "is made"), paragraph("  ")]},
+        {"blocks": [paragraph("between {{landlord_name}} and {{tenant_name}}.")]},
+    ]}
+    assert extract_text(document) == "This lease is made\nbetween landlord_name and tenant_name."
+
+
+def test_extract_text_includes_tables_headers_and_footers():
+    document = {"sections": [{
+        "blocks": [
+            paragraph("Before the table"),
+            {"rows": [{"cells": [
+                {"blocks": [paragraph("Cell one")]},
+                {"blocks": [{"rows": [{"cells": [{"blocks": [paragraph("Nested cell")]}]}]}]},
+            ]}]},
+            paragraph("After the table"),
+        ],
+        "headersFooters": {
+            "header": {"blocks": [paragraph("Header text")]},
+            "footer": {"blocks": [paragraph("Page footer")]},
+        },
+    }]}
+    assert extract_text(document).split("\n") == [
+        "Before the table", "Cell one", "Nested cell", "After the table", "Header text", "Page footer",
+    ]
+
+
+def test_extract_text_reads_optimized_keys():
+    document = {"sec": [{"b": [{"i": [{"tlp": "Short "}, {"tlp": "form"}]}]}]}
+    assert extract_text(document) == "Short form"
+
+
+def test_extract_text_of_non_documents():
+    assert extract_text(None) == ""
+    assert extract_text({"blocks": [paragraph("No sections")]}) == ""